@@ -0,0 +1,116 @@
+"""
+Подписанные токены доступа (JWT HS256 на стандартной библиотеке).
+
+Токен хранит имя пользователя и организацию, поэтому для проверки запроса не
+нужно обращаться к users_db. Успешно проверенные токены кэшируются в LRU,
+повторные запросы с тем же токеном проверяют только срок действия.
+Недействительные токены в кэш не попадают и не могут вытеснить из него
+действительные.
+
+Замер стоимости проверки:
+
+    python auth_tokens.py
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+_secret_key: Optional[bytes] = None
+
+ACCESS_TOKEN_EXPIRE_SECONDS = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "720")) * 60
+TOKEN_CACHE_SIZE = 4096
+
+_HEADER = base64.urlsafe_b64encode(
+    json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(',', ':')).encode()
+).rstrip(b'=')
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _get_secret_key() -> bytes:
+    """Ключ подписи; читается при первой выдаче или проверке токена"""
+    global _secret_key
+    if _secret_key is None:
+        secret = os.environ.get("AUTH_SECRET_KEY")
+        if not secret:
+            # Без общего ключа токены действительны только в этом процессе
+            logging.warning("AUTH_SECRET_KEY не задан, используется случайный ключ")
+            secret = secrets.token_hex(32)
+        _secret_key = secret.encode()
+    return _secret_key
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return hmac.new(_get_secret_key(), signing_input, hashlib.sha256).digest()
+
+
+def create_access_token(username: str, organization: str) -> str:
+    """Создает подписанный токен для пользователя"""
+    payload = {
+        "sub": username,
+        "org": organization,
+        "exp": int(time.time()) + ACCESS_TOKEN_EXPIRE_SECONDS,
+    }
+    signing_input = _HEADER + b'.' + _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return (signing_input + b'.' + _b64encode(_sign(signing_input))).decode()
+
+
+# token -> (username, organization, exp), только для прошедших проверку подписи
+_verified_tokens: "OrderedDict[str, Tuple[str, str, int]]" = OrderedDict()
+
+
+def _verify_signature(token: str) -> Optional[Tuple[str, str, int]]:
+    """Проверяет подпись и возвращает (username, organization, exp)"""
+    try:
+        header, payload, signature = token.split('.')
+        signing_input = f"{header}.{payload}".encode()
+        if not hmac.compare_digest(_b64decode(signature), _sign(signing_input)):
+            return None
+        if json.loads(_b64decode(header)).get("alg") != "HS256":
+            return None
+        claims = json.loads(_b64decode(payload))
+        return claims["sub"], claims["org"], int(claims["exp"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def verify_access_token(token: str) -> Optional[Tuple[str, str]]:
+    """Возвращает (username, organization) для действительного токена или None"""
+    verified = _verified_tokens.get(token)
+    if verified is not None:
+        _verified_tokens.move_to_end(token)
+    else:
+        verified = _verify_signature(token)
+        if verified is None:
+            return None
+        _verified_tokens[token] = verified
+        if len(_verified_tokens) > TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    username, organization, exp = verified
+    if exp < time.time():
+        return None
+    return username, organization
+
+
+if __name__ == "__main__":
+    import timeit
+
+    token = create_access_token("foundation", "foundation")
+    runs = 100_000
+    cold = timeit.timeit(lambda: (_verified_tokens.clear(), verify_access_token(token)), number=runs)
+    warm = timeit.timeit(lambda: verify_access_token(token), number=runs)
+    print(f"Проверка без кэша: {cold / runs * 1e6:.2f} мкс/запрос")
+    print(f"Проверка из кэша:  {warm / runs * 1e6:.2f} мкс/запрос")
@@ -0,0 +1,117 @@
+"""
+Индекс мероприятий для быстрого поиска и постраничной выдачи.
+
+Хранит мероприятия по ID и для каждой организации - список ключей
+(created_at, id), отсортированный по дате создания. Диапазон дат находится
+бинарным поиском, курсор страницы - это ключ последнего выданного
+мероприятия, поэтому выдача страницы не зависит от общего числа мероприятий.
+Поиск по названию просматривает не больше MAX_SCAN_KEYS ключей за страницу:
+если подходящих мероприятий меньше, страница возвращается неполной, а курсор
+указывает, откуда продолжить просмотр.
+"""
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EventKey = Tuple[str, str]
+
+# Сколько ключей просматривает одна страница при поиске по названию
+MAX_SCAN_KEYS = 2000
+
+
+def encode_cursor(key: EventKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> EventKey:
+    """Разбирает курсор страницы; ValueError, если курсор поврежден"""
+    try:
+        created_at, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Некорректный курсор")
+    return str(created_at), str(event_id)
+
+
+class EventIndex:
+    """Мероприятия по ID и по организации в порядке создания"""
+
+    def __init__(self):
+        self._by_id: Dict[str, dict] = {}
+        self._by_org: Dict[str, List[EventKey]] = {}
+
+    @staticmethod
+    def _key(event: dict) -> EventKey:
+        return event.get("created_at") or "", event["id"]
+
+    def rebuild(self, events: Iterable[dict]):
+        self._by_id = {}
+        self._by_org = {}
+        for event in events:
+            self._by_id[event["id"]] = event
+            self._by_org.setdefault(event.get("organization_id"), []).append(self._key(event))
+        for keys in self._by_org.values():
+            keys.sort()
+
+    def get(self, event_id: str) -> Optional[dict]:
+        return self._by_id.get(event_id)
+
+    def add(self, event: dict):
+        self._by_id[event["id"]] = event
+        insort(self._by_org.setdefault(event.get("organization_id"), []), self._key(event))
+
+    def remove(self, event: dict):
+        self._by_id.pop(event["id"], None)
+        keys = self._by_org.get(event.get("organization_id"), [])
+        position = bisect_left(keys, self._key(event))
+        if position < len(keys) and keys[position] == self._key(event):
+            del keys[position]
+
+    def list(self, organization_id: str) -> List[dict]:
+        """Все мероприятия организации в порядке создания"""
+        return [self._by_id[event_id] for _, event_id in self._by_org.get(organization_id, [])]
+
+    def page(
+        self,
+        organization_id: str,
+        limit: int,
+        after: Optional[EventKey] = None,
+        name_query: Optional[str] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        max_scan: int = MAX_SCAN_KEYS
+    ) -> Tuple[List[dict], Optional[EventKey]]:
+        """
+        Страница мероприятий и ключ для следующей страницы (None, если это последняя)
+        
+        При поиске по названию страница может быть неполной или пустой, но с
+        ключом продолжения: просмотр ограничен max_scan ключами.
+        """
+        keys = self._by_org.get(organization_id, [])
+        start = 0
+        if created_from:
+            start = bisect_left(keys, (created_from, ""))
+        if after:
+            start = max(start, bisect_right(keys, after))
+        end = len(keys)
+        if created_to:
+            # Верхняя граница включительно: ключи с этой датой и любым ID
+            end = bisect_right(keys, (created_to, "\uffff"))
+
+        needle = name_query.casefold() if name_query else None
+        items = []
+        last_key = None
+        for position in range(start, end):
+            if needle and position - start == max_scan:
+                # Лимит просмотра исчерпан - продолжим после последнего просмотренного ключа
+                return items, keys[position - 1]
+            key = keys[position]
+            event = self._by_id[key[1]]
+            if needle and needle not in (event.get("name") or "").casefold():
+                continue
+            if len(items) == limit:
+                # Есть хотя бы еще одно подходящее мероприятие
+                return items, last_key
+            items.append(event)
+            last_key = key
+        return items, None
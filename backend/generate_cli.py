@@ -0,0 +1,219 @@
+"""
+Офлайн-генерация сертификатов без запуска API.
+
+Читает участников из CSV построчно, рендерит PDF в нескольких процессах и
+складывает результат в каталог и/или ZIP. Запуск:
+
+    python generate_cli.py participants.csv --template classic_certificate.svg \\
+        --event-name "Олимпиада" --output out/ --zip out/certificates.zip
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import main as service
+from main import BASE_TEMPLATES_DIR, generate_pdf_certificate
+from participant_batch import ParticipantRow
+
+# Поддерживаемые названия колонок CSV (как в files/test_participants.csv и английские)
+CSV_COLUMNS = {
+    "fio": ("фио", "fio", "имя", "name"),
+    "email": ("адрес электронной почты", "email", "e-mail", "почта"),
+    "role": ("роль", "role"),
+    "place": ("место", "place"),
+}
+
+
+def resolve_template(template: str) -> Path:
+    """Ищет шаблон по пути или по имени файла в каталоге базовых шаблонов"""
+    path = Path(template)
+    if path.exists():
+        return path
+    # BASE_TEMPLATES_DIR относителен каталогу бэкенда, а не текущему каталогу
+    path = Path(service.__file__).resolve().parent / BASE_TEMPLATES_DIR / template
+    if path.exists():
+        return path
+    raise FileNotFoundError(f"Шаблон не найден: {template}")
+
+
+def read_participants(csv_path: Path) -> Iterator[Tuple[int, Optional[ParticipantRow], Optional[str]]]:
+    """
+    Построчно читает участников из CSV, не загружая файл целиком
+
+    Заголовок проверяется сразу при вызове (ValueError, если нет колонки ФИО),
+    строки читаются лениво. Для каждой строки отдается (номер строки,
+    участник, None) или (номер строки, None, ошибка); после ошибки чтения
+    файла (кодировка, формат CSV) чтение прекращается.
+    """
+    f = open(csv_path, 'r', encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(f)
+    headers = {h.strip().lower(): h for h in (reader.fieldnames or [])}
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        columns[field] = next((headers[a] for a in aliases if a in headers), None)
+    if not columns["fio"]:
+        f.close()
+        raise ValueError("В CSV нет колонки с ФИО")
+    return _iter_participants(f, reader, columns)
+
+
+def _iter_participants(f, reader: csv.DictReader,
+                       columns: dict) -> Iterator[Tuple[int, Optional[ParticipantRow], Optional[str]]]:
+    line_number = 1
+    with f:
+        try:
+            for line_number, row in enumerate(reader, start=2):
+                fio = (row.get(columns["fio"]) or '').strip()
+                if not fio:
+                    continue
+                place = (row.get(columns["place"]) or '').strip() if columns["place"] else ''
+                role = (row.get(columns["role"]) or '').strip() if columns["role"] else 'участник'
+                try:
+                    place = int(place) if place else None
+                except ValueError:
+                    yield line_number, None, f"некорректное место: {place!r}"
+                    continue
+                yield line_number, ParticipantRow(
+                    fio,
+                    (row.get(columns["email"]) or '').strip() if columns["email"] else '',
+                    sys.intern(role),
+                    place,
+                ), None
+        except (UnicodeDecodeError, csv.Error) as e:
+            yield line_number + 1, None, f"ошибка чтения CSV, остаток файла пропущен: {e}"
+
+
+# Параметры рендеринга, общие для всех строк; задаются один раз на процесс пула
+_render_settings = {}
+
+
+def _init_render_process(template_content: str, template_type: str, event_name: str, issue_date: Optional[str]):
+    _render_settings.update(
+        template_content=template_content,
+        template_type=template_type,
+        event_name=event_name,
+        issue_date=issue_date,
+    )
+
+
+def _render_row(line_number: int, participant: ParticipantRow) -> Tuple[int, str, bytes]:
+    """Рендерит один сертификат в процессе пула"""
+    pdf_buffer = generate_pdf_certificate(
+        participant,
+        _render_settings["template_content"],
+        _render_settings["template_type"],
+        _render_settings["event_name"],
+        _render_settings["issue_date"]
+    )
+    return line_number, participant.fio, pdf_buffer.getvalue()
+
+
+def _safe_filename(name: str) -> str:
+    return "".join(c if c.isalnum() or c in " ._-" else "_" for c in name).strip() or "certificate"
+
+
+def _print_progress(done: int, failed: int, started: float):
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    sys.stderr.write(f"\r⏳ Готово: {done}  ошибок: {failed}  {rate:.1f} серт./с")
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-генерация сертификатов из CSV")
+    parser.add_argument("csv", help="CSV со списком участников")
+    parser.add_argument("--template", required=True, help="Путь к шаблону или имя файла из templates/")
+    parser.add_argument("--event-name", required=True)
+    parser.add_argument("--issue-date", default=None)
+    parser.add_argument("--output", default="certificates_out", help="Каталог для PDF")
+    parser.add_argument("--zip", default=None, help="Путь к ZIP архиву")
+    parser.add_argument("--no-pdf-files", action="store_true", help="Писать только ZIP, без отдельных PDF")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Число процессов рендеринга")
+    args = parser.parse_args()
+    if args.no_pdf_files and not args.zip:
+        parser.error("--no-pdf-files без --zip: результат некуда записать")
+
+    try:
+        template_path = resolve_template(args.template)
+        template_content = template_path.read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        parser.error(str(e))
+    template_type = 'svg' if template_path.suffix.lower() == '.svg' else 'html'
+
+    try:
+        rows = read_participants(Path(args.csv))
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        parser.error(f"{args.csv}: {e}")
+
+    output_dir = Path(args.output)
+    if not args.no_pdf_files:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    zip_file = zipfile.ZipFile(args.zip, 'w') if args.zip else None
+
+    done = 0
+    failures = []
+    # Ограничиваем число задач в полете, чтобы не держать весь CSV в памяти
+    max_in_flight = max(1, args.jobs) * 4
+    started = time.monotonic()
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max(1, args.jobs),
+            initializer=_init_render_process,
+            initargs=(template_content, template_type, args.event_name, args.issue_date)
+        ) as pool:
+            in_flight = {}
+            exhausted = False
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    row = next(rows, None)
+                    if row is None:
+                        exhausted = True
+                        break
+                    line_number, participant, error = row
+                    if error:
+                        failures.append((line_number, error))
+                        continue
+                    future = pool.submit(_render_row, line_number, participant)
+                    in_flight[future] = line_number
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    line_number = in_flight.pop(future)
+                    try:
+                        _, fio, pdf_bytes = future.result()
+                    except Exception as e:
+                        failures.append((line_number, str(e)))
+                        continue
+                    filename = f"{line_number:06d}_{_safe_filename(fio)}.pdf"
+                    if not args.no_pdf_files:
+                        (output_dir / filename).write_bytes(pdf_bytes)
+                    if zip_file:
+                        zip_file.writestr(filename, pdf_bytes)
+                    done += 1
+                _print_progress(done, len(failures), started)
+    finally:
+        # Архив закрывается и при ошибке, иначе в нем не будет центрального каталога
+        if zip_file:
+            zip_file.close()
+
+    elapsed = time.monotonic() - started
+    sys.stderr.write("\n")
+    print(f"✅ Сгенерировано {done} сертификатов за {elapsed:.1f} с ({done / elapsed if elapsed > 0 else 0:.1f} серт./с)")
+    if failures:
+        print(f"❌ Ошибок: {len(failures)}")
+        for line_number, error in failures:
+            print(f"   строка {line_number}: {error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
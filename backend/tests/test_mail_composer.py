@@ -0,0 +1,42 @@
+import pytest
+
+from mail_composer import BatchMailComposer, OutgoingEmail, validate_address
+from participant_batch import ParticipantRow
+
+
+def composer() -> BatchMailComposer:
+    return BatchMailComposer("Сертификат: {название}", "Здравствуйте, {имя}!", "Олимпиада", sender="noreply@example.com")
+
+
+def test_message_headers_and_placeholders():
+    message = composer().compose(ParticipantRow("Иванов Иван", "ivanov@example.com", "участник"), b"%PDF", "cert.pdf")
+    assert message.body == "Здравствуйте, Иванов Иван!"
+    raw = message.as_bytes()
+    assert b"To: ivanov@example.com\r\n" in raw
+    assert b"From: noreply@example.com\r\n" in raw
+
+
+@pytest.mark.parametrize("address", [
+    "victim@example.com\r\nBcc: everyone@example.com",
+    "victim@example.com\nBcc: everyone@example.com",
+    "Имя <victim@example.com>",
+    "a@b.com, c@d.com",
+    "no-at-sign",
+    "",
+])
+def test_invalid_recipient_is_rejected(address):
+    with pytest.raises(ValueError):
+        composer().compose(ParticipantRow("Иванов Иван", address, "участник"))
+
+
+def test_build_mime_rejects_injected_recipient():
+    mail = composer()
+    message = OutgoingEmail(mail, "a@example.com\r\nBcc: b@example.com", "Тема", "Текст", None, None)
+    with pytest.raises(ValueError):
+        mail.build_mime(message)
+
+
+def test_invalid_sender_is_rejected():
+    assert validate_address("noreply@localhost") == "noreply@localhost"
+    with pytest.raises(ValueError):
+        BatchMailComposer("Тема", "Текст", "Олимпиада", sender="noreply@example.com\r\nBcc: x@example.com")
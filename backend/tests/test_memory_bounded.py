@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+# Рендеринг ReportLab заменен заглушкой: проверяется конвейер
+# генератор участников → планировщик → ZIP, а не сам ReportLab
+SCRIPT = """
+import asyncio, json, resource, sys, zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+from participant_batch import ParticipantRow
+
+count, write_zip = int(sys.argv[1]), sys.argv[2] == "zip"
+pdf = b"%PDF-1.4\\n" + b"x" * 4000
+main.render_pdf_from_file = lambda *args: pdf
+main._render_pool = ThreadPoolExecutor(2)
+
+def participants():
+    for i in range(count):
+        yield ParticipantRow(f"Участник {i}", f"p{i}@example.com", "участник", None)
+
+async def run():
+    rendered = 0
+    with zipfile.ZipFile("certificates.zip", "w") as zip_file:
+        async for participant, cert_id, pdf_bytes in main.render_certificates_scheduled(
+            "org", participants(), main.Path(sys.argv[3]), "html", "Олимпиада"
+        ):
+            if write_zip:
+                zip_file.writestr(f"{participant.fio}_certificate.pdf", pdf_bytes)
+            rendered += 1
+    return rendered
+
+rendered = asyncio.run(run())
+print(json.dumps({"rendered": rendered, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+# Допустимый рост пикового RSS конвейера без ZIP между 1k и 100k участников
+PIPELINE_MARGIN_KB = 16 * 1024
+# ZipFile держит запись центрального каталога (ZipInfo + имя) на каждый файл
+# архива до закрытия; сейчас это ~0.6 КБ на сертификат
+ZIP_ENTRY_BUDGET_KB = 1
+
+
+def max_rss_kb(tmp_path, count: int, mode: str) -> int:
+    template = BACKEND_DIR / "templates" / "minimal_certificate.html"
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, str(count), mode, str(template)],
+        cwd=tmp_path, capture_output=True, text=True, timeout=300,
+        env={"PYTHONPATH": str(BACKEND_DIR), "PATH": ""}
+    )
+    assert result.returncode == 0, result.stderr
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    assert stats["rendered"] == count
+    return stats["max_rss_kb"]
+
+
+def test_peak_rss_does_not_grow_with_batch_size(tmp_path):
+    small = max_rss_kb(tmp_path, 1_000, "no-zip")
+    large = max_rss_kb(tmp_path, 100_000, "no-zip")
+    assert large - small < PIPELINE_MARGIN_KB
+
+
+def test_zip_growth_is_bounded_by_central_directory(tmp_path):
+    small = max_rss_kb(tmp_path, 1_000, "no-zip")
+    large = max_rss_kb(tmp_path, 100_000, "zip")
+    assert large - small < PIPELINE_MARGIN_KB + 100_000 * ZIP_ENTRY_BUDGET_KB
@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter, ValidationError
+
+import main
+from participant_batch import PLACE_MAX, ParticipantBatch
+
+batch_adapter = TypeAdapter(ParticipantBatch)
+
+
+def participant(**fields) -> dict:
+    return {"fio": "Иванов Иван", "email": "ivanov@example.com", "role": "участник", **fields}
+
+
+def test_batch_matches_participant_model():
+    batch = batch_adapter.validate_python([participant(place="2"), participant(place=3.0), participant()])
+    assert [row.place for row in batch] == [2, 3, None]
+    assert batch[0].as_dict() == main.Participant(**participant(place="2")).model_dump()
+
+
+@pytest.mark.parametrize("place", [1.7, "1.7", PLACE_MAX + 1, 10 ** 30])
+def test_invalid_place_is_rejected(place):
+    with pytest.raises(ValidationError):
+        batch_adapter.validate_python([participant(place=place)])
+    with pytest.raises(ValueError):
+        ParticipantBatch.from_rows([participant(place=place)])
+
+
+def test_invalid_place_is_422():
+    client = TestClient(main.app)
+    response = client.post(
+        "/api/certificates/generate",
+        json={"template_id": "x", "event_name": "Олимпиада", "participants": [participant(place=10 ** 30)]},
+        headers={"Authorization": f"Bearer {main.create_access_token('admin', 'admin')}"},
+    )
+    assert response.status_code == 422
+
+
+def test_openapi_describes_participant_fields():
+    schemas = main.app.openapi()["components"]["schemas"]
+    items = schemas["CertificateGenerationRequest"]["properties"]["participants"]["items"]
+    assert set(items["properties"]) == {"fio", "email", "role", "place"}
+    assert set(items["required"]) == {"fio", "email", "role"}
@@ -0,0 +1,98 @@
+import os
+import time
+
+import render_queue
+from render_queue import DirectoryBlobStore, SpoolQueue
+
+
+def _expire(queue: SpoolQueue, task_id: str):
+    past = time.time() - queue.lease_seconds - 1
+    os.utime(queue.claimed_dir / f"{task_id}.json", (past, past))
+
+
+def test_expired_lease_counts_as_attempt(tmp_path):
+    queue = SpoolQueue(tmp_path, lease_seconds=10, max_attempts=2)
+    task_id = queue.put({"items": []})
+
+    # Воркер взял задачу и умер, не отметив ни успеха, ни ошибки
+    assert queue.claim("w1")["task_id"] == task_id
+    _expire(queue, task_id)
+    task = queue.claim("w2")
+    assert task["task_id"] == task_id
+    assert task["attempts"] == 1
+
+    _expire(queue, task_id)
+    assert queue.claim("w3") is None
+    assert queue.status(task_id) == "failed"
+
+
+
+def test_claim_of_long_pending_task_is_not_expired(tmp_path, monkeypatch):
+    queue = SpoolQueue(tmp_path, lease_seconds=10)
+    other_worker = SpoolQueue(tmp_path, lease_seconds=10)
+    task_id = queue.put({"items": []})
+    # Задача ждала в pending дольше срока аренды
+    past = time.time() - queue.lease_seconds - 1
+    os.utime(queue.pending_dir / f"{task_id}.json", (past, past))
+
+    real_rename = os.rename
+
+    def rename_then_requeue(src, dst):
+        real_rename(src, dst)
+        # Другой воркер проверяет аренды сразу после переноса в claimed
+        if "claimed" in str(dst):
+            other_worker.requeue_expired()
+
+    monkeypatch.setattr(render_queue.os, "rename", rename_then_requeue)
+    task = queue.claim("w1")
+    assert task["task_id"] == task_id
+    assert task["attempts"] == 0
+    assert not any(queue.pending_dir.iterdir())
+
+
+def test_claim_skips_task_taken_after_rename(tmp_path, monkeypatch):
+    queue = SpoolQueue(tmp_path)
+    queue.put({"items": []})
+    real_rename = os.rename
+
+    def rename_then_lose(src, dst):
+        real_rename(src, dst)
+        if "claimed" in str(dst):
+            os.unlink(dst)
+
+    monkeypatch.setattr(render_queue.os, "rename", rename_then_lose)
+    assert queue.claim("w1") is None
+
+def test_fail_retries_then_moves_to_failed(tmp_path):
+    queue = SpoolQueue(tmp_path, max_attempts=2)
+    task_id = queue.put({"items": []})
+
+    queue.fail(queue.claim("w1"), "boom")
+    assert queue.status(task_id) is None
+    queue.fail(queue.claim("w1"), "boom")
+    assert queue.status(task_id) == "failed"
+
+
+def test_cancel_drops_pending_and_claimed_tasks(tmp_path):
+    queue = SpoolQueue(tmp_path)
+    claimed_id = queue.put({"items": []})
+    pending_id = queue.put({"items": []})
+    task = queue.claim("w1")
+    assert task["task_id"] in (claimed_id, pending_id)
+
+    queue.cancel([claimed_id, pending_id])
+    assert queue.claim("w2") is None
+
+    # Воркер, завершивший отмененную задачу, не оставляет записи о ней
+    queue.complete(task, {"certificate_ids": []})
+    assert queue.status(task["task_id"]) is None
+    assert not any(queue.claimed_dir.iterdir())
+
+
+def test_blob_store_roundtrip(tmp_path):
+    store = DirectoryBlobStore(tmp_path)
+    store.put("a.pdf", memoryview(b"%PDF"))
+    assert store.exists("a.pdf")
+    assert store.path("a.pdf").read_bytes() == b"%PDF"
+    store.delete("a.pdf")
+    assert not store.exists("a.pdf")
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import BACKEND_DIR
+from participant_batch import ParticipantRow
+from render_scheduler import FairScheduler, TokenBucket
+
+
+def test_slots_are_granted_round_robin():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, org_max_concurrency=1)
+        order = []
+
+        async def render(organization, index):
+            async with scheduler.slot(organization):
+                order.append(organization)
+                await asyncio.sleep(0)
+
+        # Большой пакет встал в очередь раньше маленького
+        tasks = [asyncio.ensure_future(render("big", i)) for i in range(4)]
+        tasks += [asyncio.ensure_future(render("small", i)) for i in range(2)]
+        await asyncio.gather(*tasks)
+        return order
+
+    # Первый слот "big" получил сразу, дальше организации чередуются
+    assert asyncio.run(scenario()) == ["big", "big", "small", "big", "small", "big"]
+
+
+def test_org_concurrency_cap():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=8, org_max_concurrency=2)
+        running = 0
+        peak = 0
+
+        async def render():
+            nonlocal running, peak
+            async with scheduler.slot("org"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(render() for _ in range(6)))
+        return peak, scheduler.metrics()["org"]
+
+    peak, metrics = asyncio.run(scenario())
+    assert peak == 2
+    assert metrics["granted"] == 6
+    assert metrics["running"] == 0
+
+
+def test_token_bucket():
+    assert TokenBucket(rate=0, burst=1).try_take()
+
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_take() and bucket.try_take()
+    assert not bucket.try_take()
+    assert 0 < bucket.seconds_until_token() <= 0.1
+
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=4, org_max_concurrency=4, org_rate=20, org_burst=1)
+        started = time.monotonic()
+        for _ in range(3):
+            async with scheduler.slot("org"):
+                pass
+        return time.monotonic() - started
+
+    # Первый слот из запаса, еще два ждут пополнения по 1/20 с
+    assert asyncio.run(scenario()) >= 0.08
+
+
+def test_rate_limit_is_off_by_default():
+    assert main.render_scheduler.org_rate == 0
+
+
+def test_scheduler_metrics_require_token():
+    client = TestClient(main.app)
+    assert client.get("/api/metrics/scheduler").status_code == 401
+
+
+def test_scheduler_metrics_show_only_own_organization(monkeypatch):
+    scheduler = FairScheduler(max_concurrency=4, org_max_concurrency=2)
+
+    async def render(organization):
+        async with scheduler.slot(organization):
+            pass
+
+    async def scenario():
+        await asyncio.gather(render("lyceum"), render("foundation"))
+
+    asyncio.run(scenario())
+    monkeypatch.setattr(main, "render_scheduler", scheduler)
+    client = TestClient(main.app)
+    token = main.create_access_token("lyceum", "lyceum")
+    response = client.get("/api/metrics/scheduler", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert list(response.json()) == ["lyceum"]
+    assert response.json()["lyceum"]["granted"] == 1
+
+
+TEMPLATE_PATH = BACKEND_DIR / "templates" / "minimal_certificate.html"
+
+
+def participants(count: int):
+    return [ParticipantRow(f"Участник {i}", f"p{i}@example.com", "участник", None) for i in range(count)]
+
+
+async def render_all(rows) -> list:
+    return [
+        item async for item in main.render_certificates_scheduled(
+            "org", rows, TEMPLATE_PATH, "html", "Олимпиада"
+        )
+    ]
+
+
+@pytest.fixture
+def render_pool():
+    yield
+    if main._render_pool is not None:
+        main._render_pool.shutdown()
+        main._render_pool = None
+
+
+def test_render_certificates_in_process_pool(render_pool):
+    rows = participants(3)
+    rendered = asyncio.run(render_all(rows))
+    assert sorted(p.fio for p, _, _ in rendered) == [p.fio for p in rows]
+    assert all(pdf.startswith(b"%PDF") for _, _, pdf in rendered)
+
+
+def test_render_pool_is_replaced_after_worker_dies(render_pool):
+    asyncio.run(render_all(participants(1)))
+    broken_pool = main._render_pool
+    # Процесс пула погибает, как при OOM kill или падении ReportLab
+    for pid in list(broken_pool._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    rendered = asyncio.run(render_all(participants(3)))
+    assert len(rendered) == 3
+    assert main._render_pool is not broken_pool
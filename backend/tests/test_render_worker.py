@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+import render_worker
+from conftest import BACKEND_DIR
+from participant_batch import ParticipantBatch
+from render_queue import DirectoryBlobStore, SpoolQueue
+from render_worker import process_task, run_worker
+
+TEMPLATE_CONTENT = (BACKEND_DIR / "templates" / "minimal_certificate.html").read_text(encoding='utf-8')
+
+
+def make_batch(count: int) -> ParticipantBatch:
+    return ParticipantBatch.from_rows(
+        {"fio": f"Участник {i}", "email": f"p{i}@example.com", "role": "участник"} for i in range(count)
+    )
+
+
+def make_task(cert_ids) -> dict:
+    return {
+        "items": [
+            {"cert_id": cert_id, "participant": {"fio": "Иванов Иван", "email": "i@example.com", "role": "участник", "place": 1}}
+            for cert_id in cert_ids
+        ],
+        "template_content": TEMPLATE_CONTENT,
+        "template_type": "html",
+        "event_name": "Олимпиада",
+    }
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    """Очередь и хранилище PDF сервиса в tmp_path"""
+    certificates_dir = tmp_path / "certificates"
+    certificates_dir.mkdir()
+    monkeypatch.setattr(main, "RENDER_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(main, "CERTIFICATES_DIR", certificates_dir)
+    monkeypatch.setattr(main, "DISTRIBUTED_CHUNK_SIZE", 2)
+    return SpoolQueue(tmp_path / "spool"), DirectoryBlobStore(certificates_dir)
+
+
+def test_run_worker_renders_queued_tasks(tmp_path):
+    queue = SpoolQueue(tmp_path / "spool")
+    blob_store = DirectoryBlobStore(tmp_path / "blobs")
+    first = queue.put(make_task(["a", "b"]))
+    second = queue.put(make_task(["c"]))
+
+    assert run_worker(queue, blob_store, "w1", poll_interval=0, once=True) == 2
+    assert queue.status(first) == queue.status(second) == "done"
+    for cert_id in "abc":
+        assert blob_store.path(f"{cert_id}.pdf").read_bytes().startswith(b"%PDF")
+
+
+def test_process_task_stops_on_cancelled_task(tmp_path):
+    queue = SpoolQueue(tmp_path / "spool")
+    blob_store = DirectoryBlobStore(tmp_path / "blobs")
+    task_id = queue.put(make_task(["a"]))
+    task = queue.claim("w1")
+    queue.cancel([task_id])
+
+    assert process_task(task, blob_store, queue) is None
+    assert not blob_store.exists("a.pdf")
+
+
+def test_failing_task_is_retried_then_failed(tmp_path, monkeypatch):
+    def broken_render(*args):
+        raise RuntimeError("ReportLab упал")
+
+    monkeypatch.setattr(render_worker, "generate_pdf_certificate", broken_render)
+    queue = SpoolQueue(tmp_path / "spool", max_attempts=2)
+    task_id = queue.put(make_task(["a"]))
+
+    assert run_worker(queue, DirectoryBlobStore(tmp_path / "blobs"), "w1", poll_interval=0, once=True) == 0
+    assert queue.status(task_id) == "failed"
+
+
+async def consume_with_worker(batch: ParticipantBatch, worker) -> list:
+    """Читает распределенный рендер, пока воркер в потоке разбирает очередь"""
+    rendered = main.render_certificates_distributed(batch, TEMPLATE_CONTENT, "html", "Олимпиада")
+
+    async def collect():
+        return [item async for item in rendered]
+
+    consumer = asyncio.ensure_future(collect())
+    # Сервис ставит задачи в очередь до первого ожидания
+    await asyncio.sleep(0.05)
+    await asyncio.to_thread(worker)
+    return await consumer
+
+
+def test_distributed_render_happy_path(spool):
+    queue, blob_store = spool
+    batch = make_batch(5)
+    worker_queue = SpoolQueue(queue.root)
+
+    rendered = asyncio.run(consume_with_worker(
+        batch, lambda: run_worker(worker_queue, blob_store, "w1", poll_interval=0, once=True)
+    ))
+    assert [p.fio for p, _, _ in rendered] == [p.fio for p in batch]
+    assert all(pdf is None and blob_store.exists(f"{cert_id}.pdf") for _, cert_id, pdf in rendered)
+    # Записи о выполненных задачах убраны
+    assert not any(queue.done_dir.iterdir())
+
+
+def test_distributed_render_falls_back_for_failed_tasks(spool, monkeypatch):
+    queue, blob_store = spool
+
+    def broken_render(*args):
+        raise RuntimeError("ReportLab упал")
+
+    monkeypatch.setattr(render_worker, "generate_pdf_certificate", broken_render)
+    worker_queue = SpoolQueue(queue.root, max_attempts=1)
+
+    rendered = asyncio.run(consume_with_worker(
+        make_batch(3), lambda: run_worker(worker_queue, blob_store, "w1", poll_interval=0, once=True)
+    ))
+    assert len(rendered) == 3
+    for _, cert_id, _ in rendered:
+        assert blob_store.path(f"{cert_id}.pdf").read_bytes().startswith(b"%PDF")
+    assert not any(queue.failed_dir.iterdir())
+
+
+def test_distributed_timeout_cancels_tasks_and_deletes_pdfs(spool, monkeypatch):
+    queue, blob_store = spool
+    monkeypatch.setattr(main, "DISTRIBUTED_TIMEOUT", 0.1)
+    worker_queue = SpoolQueue(queue.root)
+
+    def finish_one_task():
+        # Воркер успевает сделать только одну задачу из двух
+        task = worker_queue.claim("w1")
+        worker_queue.complete(task, process_task(task, blob_store, worker_queue))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(consume_with_worker(make_batch(4), finish_one_task))
+    assert error.value.status_code == 504
+    assert not any(blob_store.root.iterdir())
+    assert not any(queue.pending_dir.iterdir())
+    assert not any(queue.done_dir.iterdir())
+    assert worker_queue.claim("w2") is None
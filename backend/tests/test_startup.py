@@ -0,0 +1,70 @@
+import json
+import shutil
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+# Импорт main на холодную сейчас ~0.5 с, почти все - FastAPI/pydantic
+IMPORT_BUDGET_SECONDS = 2.0
+
+HEAVY_MODULES = ("reportlab", "smtplib", "email.mime", "uvicorn")
+
+
+def run_python(cwd, code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd, capture_output=True, text=True, timeout=60,
+        env={"PYTHONPATH": str(BACKEND_DIR), "PATH": ""}
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_lazy_and_fast(tmp_path):
+    stats = run_python(tmp_path, f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+heavy = sorted(m for m in sys.modules if m.startswith({HEAVY_MODULES!r}))
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+""")
+    assert stats["heavy"] == []
+    assert stats["elapsed"] < IMPORT_BUDGET_SECONDS
+    # Импорт не создает каталогов и не читает базу мероприятий
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_initialize_app_is_idempotent(tmp_path):
+    shutil.copytree(BACKEND_DIR / "templates", tmp_path / "templates")
+    base_templates = len(list((tmp_path / "templates").iterdir()))
+
+    stats = run_python(tmp_path, """
+import json, shutil
+import main
+
+copies = []
+original_copy = shutil.copy
+shutil.copy = lambda *args: copies.append(args) or original_copy(*args)
+
+main.initialize_app()
+main.initialize_app()
+first_ids = sorted(t["id"] for t in main.templates_db)
+
+# Повторный запуск процесса: шаблоны уже скопированы, ID те же
+main._app_initialized = False
+main.templates_db.clear()
+main.initialize_app()
+
+print(json.dumps({
+    "copies": len(copies),
+    "templates": len(main.templates_db),
+    "same_ids": first_ids == sorted(t["id"] for t in main.templates_db),
+    "files": len(list(main.TEMPLATES_DIR.iterdir())),
+}))
+""")
+    assert stats["copies"] == base_templates
+    assert stats["templates"] == base_templates
+    assert stats["same_ids"]
+    assert stats["files"] == base_templates